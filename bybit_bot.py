@@ -4,15 +4,27 @@
 # ======================================================
 
 import os
+import sys
 import time
 import math
 import json
+import mmap
+import atexit
+import signal
+import argparse
+import bisect
+import hashlib
 import threading
+import multiprocessing
 import requests
+from array import array
 from datetime import datetime
+from decimal import Decimal, ROUND_FLOOR
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from multiprocessing.managers import BaseManager
 
-from flask import Flask, request, send_from_directory
-from pybit.unified_trading import HTTP
+from flask import Flask, jsonify, request, send_from_directory
+from pybit.unified_trading import HTTP, WebSocket
 
 # ======================================================
 # MODE CONFIG (DEMO / REAL)
@@ -47,10 +59,18 @@ KILL_SWITCH = False
 
 START_DAY_BALANCE = None
 TRADES_TODAY = 0
+DAILY_PNL = 0.0       # realized PnL of trades closed today
 
 OPEN_POSITIONS = {}   # symbol -> position data
+OPEN_TRADES = {}      # symbol -> trade opened by the bot
 SYMBOL_COOLDOWN = {}  # symbol -> last trade time
 
+# Cached for queries (telegram / web) so they never hit the exchange
+LAST_BALANCE = None   # (balance, time)
+LAST_PRICES = {}      # symbol -> (last price, time)
+SCAN_STATE = {}       # symbol -> outcome of its last scan
+SCAN_STATS = {"passes": 0, "last": None, "max": 0.0, "total": 0.0, "at": None}
+
 # ======================================================
 # RISK SETTINGS (BASE – SAFE DEFAULTS)
 # ======================================================
@@ -63,27 +83,80 @@ MAX_TRADES_PER_DAY = 5
 COOLDOWN_SECONDS = 300    # 5 minutes per symbol
 
 # ======================================================
-# CONNECT TO BYBIT
+# CONNECT TO BYBIT (LAZY)
 # ======================================================
 
-print("🔌 Connecting to Bybit...")
+CONNECT_RETRIES = 5
+CONNECT_BACKOFF = 2       # seconds, doubled per retry
+
+EXCHANGE_READY = threading.Event()
+
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session():
+    """
+    Builds and verifies the pybit session on first use,
+    retrying with backoff; later calls return it at once
+    """
+    global _SESSION
+
+    if _SESSION is not None:
+        return _SESSION
+
+    with _SESSION_LOCK:
+        delay = CONNECT_BACKOFF
+        for attempt in range(1, CONNECT_RETRIES + 1):
+            if _SESSION is not None:
+                break
+            try:
+                print("🔌 Connecting to Bybit...")
+                s = HTTP(
+                    api_key=API_KEY,
+                    api_secret=API_SECRET,
+                    testnet=TESTNET
+                )
+                s.get_server_time()
+                _SESSION = s
+            except Exception as e:
+                print(f"Bybit connect failed ({attempt}/{CONNECT_RETRIES}): {e}")
+                if attempt < CONNECT_RETRIES:
+                    time.sleep(delay)
+                    delay *= 2
+
+        if _SESSION is None:
+            raise ConnectionError("Bybit unreachable")
+
+    return _SESSION
+
+
+class LazySession:
+    """Stands in for the pybit session until the first call"""
+
+    def __getattr__(self, name):
+        return getattr(get_session(), name)
+
 
-session = HTTP(
-    api_key=API_KEY,
-    api_secret=API_SECRET,
-    testnet=TESTNET
-)
+session = LazySession()
 
 # ======================================================
 # TELEGRAM CORE
 # ======================================================
 
+TG_API = f"https://api.telegram.org/bot{TG_TOKEN}"
+
+# One pooled client for sends and the long-poll (keep-alive, no per-call TLS)
+TG_HTTP = requests.Session()
+TG_HTTP.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=8))
+
+
 def tg(message: str):
     if not TG_TOKEN or TG_ADMIN == 0:
         return
     try:
-        requests.post(
-            f"https://api.telegram.org/bot{TG_TOKEN}/sendMessage",
+        TG_HTTP.post(
+            f"{TG_API}/sendMessage",
             data={
                 "chat_id": TG_ADMIN,
                 "text": message
@@ -98,9 +171,13 @@ def tg(message: str):
 # ======================================================
 
 def get_balance():
+    global LAST_BALANCE
+
     try:
         r = session.get_wallet_balance(accountType="UNIFIED")
-        return float(r["result"]["list"][0]["totalWalletBalance"])
+        balance = float(r["result"]["list"][0]["totalWalletBalance"])
+        LAST_BALANCE = (balance, time.time())
+        return balance
     except:
         return 0.0
 
@@ -108,12 +185,31 @@ def get_balance():
 # DAILY INIT
 # ======================================================
 
-def init_day():
-    global START_DAY_BALANCE, TRADES_TODAY, KILL_SWITCH
+def reset_day_counters():
+    """No exchange call: starts from the cached balance until refreshed"""
+    global START_DAY_BALANCE, TRADES_TODAY, KILL_SWITCH, DAILY_PNL
 
-    START_DAY_BALANCE = get_balance()
     TRADES_TODAY = 0
+    DAILY_PNL = 0.0
     KILL_SWITCH = False
+    if LAST_BALANCE:
+        START_DAY_BALANCE = LAST_BALANCE[0]
+
+
+def refresh_day_balance():
+    global START_DAY_BALANCE
+
+    balance = get_balance()
+    if balance:
+        START_DAY_BALANCE = balance
+    tg(f"🔄 DAILY RESET DONE\nBalance: {START_DAY_BALANCE}")
+
+
+def init_day():
+    global START_DAY_BALANCE
+
+    reset_day_counters()
+    START_DAY_BALANCE = get_balance()
 
     tg(
         f"🚀 BYBIT BOT STARTED ({MODE})\n"
@@ -160,17 +256,43 @@ SYMBOLS = [
 # FETCH CANDLES
 # ===============================
 
-def get_klines(symbol, interval="5", limit=100):
+KLINE_REFRESH_BARS = 3    # bars pulled per scan once the cache is warm
+
+KLINE_CACHE = {}          # (symbol, interval) -> klines, newest first
+
+
+def get_klines(symbol, interval="5", limit=50):
+    """
+    Full pull on a cold cache, else only the last few bars
+    merged in by start time (Bybit lists newest first)
+    """
+    key = (symbol, interval)
+    cached = KLINE_CACHE.get(key) or []
+    warm = len(cached) >= limit
+
     try:
         r = session.get_kline(
             category="linear",
             symbol=symbol,
             interval=interval,
-            limit=limit
+            limit=KLINE_REFRESH_BARS if warm else limit
         )
-        return r["result"]["list"]
+        fresh = r["result"]["list"]
     except:
-        return []
+        return None
+
+    # gap since the cached bars -> start over from the full pull
+    if warm and fresh and int(fresh[-1][0]) > int(cached[0][0]):
+        KLINE_CACHE.pop(key, None)
+        return get_klines(symbol, interval, limit)
+
+    if warm:
+        merged = {k[0]: k for k in cached}
+        merged.update({k[0]: k for k in fresh})
+        fresh = sorted(merged.values(), key=lambda k: int(k[0]), reverse=True)
+
+    KLINE_CACHE[key] = fresh[:limit]
+    return KLINE_CACHE[key]
 
 # ===============================
 # PRICE HELPERS
@@ -182,7 +304,9 @@ def get_last_price(symbol):
             category="linear",
             symbol=symbol
         )
-        return float(r["result"]["list"][0]["lastPrice"])
+        price = float(r["result"]["list"][0]["lastPrice"])
+        LAST_PRICES[symbol] = (price, time.time())
+        return price
     except:
         return None
 
@@ -237,27 +361,102 @@ def atr(highs, lows, closes, period=14):
 
 
 # ===============================
-# MARKET SNAPSHOT
+# FEATURE ENGINE
 # ===============================
+#
+# Strategies (PART 3) declare what they need as
+# (timeframe, indicator, period). The engine merges every
+# declaration into one plan, pulls each timeframe once per
+# symbol and computes each distinct indicator once per closed
+# bar, however many strategies read it. Only the live
+# indicators (price) read the forming bar, on every scan.
+
+BASE_TIMEFRAME = "5"
+MIN_BARS = 50
+
+INDICATORS = {
+    "price": lambda bars, period: bars["close"][-1],
+    "sma": lambda bars, period: sma(bars["close"], period),
+    "rsi": lambda bars, period: rsi(bars["close"], period),
+    "atr": lambda bars, period: atr(bars["high"], bars["low"], bars["close"], period)
+}
+
+LIVE_INDICATORS = {"price"}   # from the forming bar, never cached
+
+# Always computed: entries size SL / TP from price and ATR
+CORE_NEEDS = {
+    "price": (BASE_TIMEFRAME, "price", 0),
+    "atr": (BASE_TIMEFRAME, "atr", 14)
+}
+
+PIPELINE = {}        # timeframe -> {"bars": lookback, "features": {(indicator, period)}}
+FEATURE_CACHE = {}   # (symbol, timeframe) -> (last closed bar start, {(indicator, period): value})
+
+
+def compile_pipeline():
+    plan = {}
+    for needs in [CORE_NEEDS] + [s["needs"] for s in STRATEGIES]:
+        for tf, indicator, period in needs.values():
+            if indicator not in INDICATORS:
+                raise ValueError(f"Unknown indicator: {indicator}")
+            p = plan.setdefault(tf, {"bars": MIN_BARS, "features": set()})
+            p["features"].add((indicator, period))
+            p["bars"] = max(p["bars"], period + 1)
+
+    PIPELINE.clear()
+    PIPELINE.update(plan)
+    FEATURE_CACHE.clear()
+
+
+def _bars(klines):
+    rows = klines[::-1]   # Bybit lists newest first
+    return {
+        "close": [float(k[4]) for k in rows],
+        "high": [float(k[2]) for k in rows],
+        "low": [float(k[3]) for k in rows]
+    }
 
-def get_market_snapshot(symbol):
-    klines = get_klines(symbol)
-    if not klines or len(klines) < 50:
-        return None
 
-    closes = [float(k[4]) for k in klines]
-    highs = [float(k[2]) for k in klines]
-    lows = [float(k[3]) for k in klines]
+def compute_features(symbol):
+    """
+    Returns {(timeframe, indicator, period): value, "book": {...}}
+    or None when a timeframe has no candles
+    """
+    if not PIPELINE:
+        compile_pipeline()
+
+    features = {}
 
-    snapshot = {
-        "price": closes[-1],
-        "sma_fast": sma(closes, 9),
-        "sma_slow": sma(closes, 21),
-        "rsi": rsi(closes),
-        "atr": atr(highs, lows, closes)
-    }
+    for tf, plan in PIPELINE.items():
+        # one extra row: klines[0] is the bar still forming
+        klines = get_klines(symbol, tf, plan["bars"] + 1)
+        if not klines or len(klines) < 2:
+            return None
+
+        closed = klines[1:]
+        cached = FEATURE_CACHE.get((symbol, tf))
+
+        if cached is not None and cached[0] == closed[0][0]:
+            values = cached[1]
+        else:
+            bars = _bars(closed)
+            values = {
+                (indicator, period): INDICATORS[indicator](bars, period)
+                for indicator, period in plan["features"]
+                if indicator not in LIVE_INDICATORS
+            }
+            FEATURE_CACHE[(symbol, tf)] = (closed[0][0], values)
+
+        live = _bars(klines[:1])
+        for indicator, period in plan["features"]:
+            if indicator in LIVE_INDICATORS:
+                features[(tf, indicator, period)] = INDICATORS[indicator](live, period)
 
-    return snapshot
+        for (indicator, period), value in values.items():
+            features[(tf, indicator, period)] = value
+
+    features["book"] = book_features(symbol)
+    return features
 
 # ======================================================
 # PART 3 – AI TRADE FILTER
@@ -275,10 +474,83 @@ AI_MIN_RSI_SELL = 30
 AI_MAX_RSI_SELL = 65
 
 
+# ===============================
+# STRATEGY REGISTRY
+# ===============================
+
+STRATEGIES = []        # evaluated in registration order
+STRATEGY_SIGNALS = {}  # symbol -> {strategy: decision} from the last scan
+STRATEGY_CONTEXT = threading.local()   # .name / .journaled while one runs
+
+
+def register_strategy(name, needs):
+    """
+    Decorator. `needs` maps snapshot keys to (timeframe, indicator, period);
+    the function gets (symbol, snapshot) and returns "LONG" | "SHORT" | None.
+    Every snapshot also carries price, atr and the live book features.
+    """
+    def wrap(fn):
+        keys = {**CORE_NEEDS, **needs}
+        STRATEGIES[:] = [s for s in STRATEGIES if s["name"] != name]
+        STRATEGIES.append({
+            "name": name,
+            "needs": dict(needs),
+            "keys": list(keys.items()),   # compiled: snapshot key -> feature key
+            "fn": fn
+        })
+        compile_pipeline()
+        return fn
+
+    return wrap
+
+
+def evaluate_strategies(symbol, features):
+    """
+    Runs every strategy on the shared features.
+    Returns (decision, snapshot) from the first strategy that
+    fires, or (None, None) when none fire or they disagree.
+    """
+    signals = {}
+    first = None
+
+    for s in STRATEGIES:
+        snapshot = {key: features.get(feature) for key, feature in s["keys"]}
+        snapshot.update(features.get("book") or {})
+
+        STRATEGY_CONTEXT.name = s["name"]
+        STRATEGY_CONTEXT.journaled = False
+
+        try:
+            decision = s["fn"](symbol, snapshot)
+        except Exception as e:
+            print(f"Strategy {s['name']} failed on {symbol}: {e}")
+            decision = None
+
+        # strategies without their own reasons get a plain outcome row
+        if not STRATEGY_CONTEXT.journaled:
+            journal_decision(symbol, snapshot, decision, "SIGNAL" if decision else "NO_SETUP")
+        STRATEGY_CONTEXT.name = None
+
+        signals[s["name"]] = decision
+        if decision and first is None:
+            first = (decision, snapshot)
+
+    STRATEGY_SIGNALS[symbol] = signals
+
+    if first is None or len({d for d in signals.values() if d}) > 1:
+        return None, None
+    return first
+
+
 # ===============================
 # AI DECISION ENGINE
 # ===============================
 
+@register_strategy("sma_rsi", {
+    "sma_fast": (BASE_TIMEFRAME, "sma", 9),
+    "sma_slow": (BASE_TIMEFRAME, "sma", 21),
+    "rsi": (BASE_TIMEFRAME, "rsi", 14)
+})
 def ai_trade_filter(symbol, snapshot):
     """
     Returns:
@@ -286,6 +558,7 @@ def ai_trade_filter(symbol, snapshot):
     """
 
     if snapshot is None:
+        journal_decision(symbol, None, None, "NO_DATA")
         return None
 
     price = snapshot["price"]
@@ -295,12 +568,24 @@ def ai_trade_filter(symbol, snapshot):
     atr_val = snapshot["atr"]
 
     if not all([price, sma_fast, sma_slow, rsi_val, atr_val]):
+        journal_decision(symbol, snapshot, None, "NO_DATA")
         return None
 
     # -------------------------------
     # Volatility filter (ATR)
     # -------------------------------
     if atr_val / price < AI_MIN_ATR_RATIO:
+        journal_decision(symbol, snapshot, None, "ATR")
+        return None
+
+    # -------------------------------
+    # Liquidity filter (L2 book, when streamed)
+    # -------------------------------
+    spread_bps = snapshot.get("spread_bps")
+    imbalance = snapshot.get("imbalance", 0)
+
+    if spread_bps is not None and spread_bps > BOOK_MAX_SPREAD_BPS:
+        journal_decision(symbol, snapshot, None, "BOOK")
         return None
 
     # -------------------------------
@@ -310,6 +595,10 @@ def ai_trade_filter(symbol, snapshot):
         sma_fast > sma_slow and
         AI_MIN_RSI_BUY <= rsi_val <= AI_MAX_RSI_BUY
     ):
+        if imbalance < -BOOK_MAX_IMBALANCE:
+            journal_decision(symbol, snapshot, None, "BOOK")
+            return None
+        journal_decision(symbol, snapshot, "LONG", "SIGNAL")
         return "LONG"
 
     # -------------------------------
@@ -319,8 +608,13 @@ def ai_trade_filter(symbol, snapshot):
         sma_fast < sma_slow and
         AI_MIN_RSI_SELL <= rsi_val <= AI_MAX_RSI_SELL
     ):
+        if imbalance > BOOK_MAX_IMBALANCE:
+            journal_decision(symbol, snapshot, None, "BOOK")
+            return None
+        journal_decision(symbol, snapshot, "SHORT", "SIGNAL")
         return "SHORT"
 
+    journal_decision(symbol, snapshot, None, "NO_SETUP")
     return None
 
 
@@ -358,13 +652,20 @@ TP_ATR_MULTIPLIER = 3.0
 # POSITION SIZE CALC
 # ===============================
 
-def calculate_position_size(balance, price):
+def calculate_position_size(balance, price, depth_usdt=None):
     """
-    Risk-based position sizing
+    Risk-based position sizing, shrunk to a share of the
+    book depth the order would take (when known)
     """
     risk_amount = balance * RISK_PER_TRADE
     qty = (risk_amount * LEVERAGE) / price
 
+    # Liquidity cap
+    if depth_usdt is not None:
+        max_notional = depth_usdt * BOOK_MAX_DEPTH_SHARE
+        if qty * price > max_notional:
+            qty = max_notional / price
+
     # Safety minimum
     notional = qty * price
     if notional < MIN_QTY_USDT:
@@ -374,64 +675,108 @@ def calculate_position_size(balance, price):
 
 
 # ===============================
-# PLACE MARKET ORDER
+# DAILY TRADE SLOTS
 # ===============================
 
-def place_order(symbol, side, snapshot):
-    global TRADES_TODAY, OPEN_TRADES
+def reserve_trade_slot(symbol):
+    """Counts a trade against MAX_TRADES_PER_DAY (globally when sharded)"""
+    global TRADES_TODAY
 
-    if KILL_SWITCH:
+    if SHARD_CLIENT is not None:
+        try:
+            return SHARD_CLIENT.reserve_trade(SHARD_ID, symbol)
+        except:
+            return False   # coordinator unreachable -> no new risk
+
+    if TRADES_TODAY >= MAX_TRADES_PER_DAY:
+        return False
+    TRADES_TODAY += 1
+    return True
+
+
+def release_trade_slot():
+    global TRADES_TODAY
+
+    if SHARD_CLIENT is not None:
+        try:
+            SHARD_CLIENT.release_trade()
+        except:
+            pass
         return
 
-    if TRADES_TODAY >= MAX_TRADES:
+    TRADES_TODAY -= 1
+
+
+def record_closed_pnl(pnl):
+    global DAILY_PNL
+
+    if SHARD_CLIENT is not None:
+        try:
+            SHARD_CLIENT.report_pnl(pnl)
+            return
+        except:
+            pass
+
+    DAILY_PNL += pnl
+
+
+# ===============================
+# PLACE MARKET ORDER
+# ===============================
+
+def place_order(symbol, side, snapshot):
+    if KILL_SWITCH:
         return
 
     balance = get_balance()
     price = snapshot["price"]
     atr_val = snapshot["atr"]
 
-    qty = calculate_position_size(balance, price)
+    book = book_features(symbol)
+    depth = None
+    if book is not None:
+        depth = book["ask_depth"] if side == "LONG" else book["bid_depth"]
+
+    qty = calculate_position_size(balance, price, depth)
+    if qty is None:
+        return
+
+    qty = round_qty(symbol, qty)
     if qty is None:
         return
 
+    if not reserve_trade_slot(symbol):
+        return
+
     if side == "LONG":
-        order_side = "Buy"
         sl_price = price - (atr_val * SL_ATR_MULTIPLIER)
         tp_price = price + (atr_val * TP_ATR_MULTIPLIER)
     else:
-        order_side = "Sell"
         sl_price = price + (atr_val * SL_ATR_MULTIPLIER)
         tp_price = price - (atr_val * TP_ATR_MULTIPLIER)
 
-    try:
-        session.place_order(
-            category="linear",
-            symbol=symbol,
-            side=order_side,
-            orderType="Market",
-            qty=qty,
-            takeProfit=round(tp_price, 4),
-            stopLoss=round(sl_price, 4),
-            timeInForce="GoodTillCancel",
-            reduceOnly=False,
-            closeOnTrigger=False
-        )
-
-        OPEN_TRADES[symbol] = {
-            "side": side,
-            "entry": price,
-            "qty": qty,
-            "sl": sl_price,
-            "tp": tp_price
-        }
-
-        TRADES_TODAY += 1
-        mark_symbol_traded(symbol)
+    OPEN_TRADES[symbol] = {
+        "side": side,
+        "entry": price,
+        "qty": qty,
+        "sl": sl_price,
+        "tp": tp_price,
+        "time": time.time(),
+        "pending": True
+    }
+    journal_order(symbol, side, price, qty)
 
-        tg(f"📈 {side} OPENED\n{symbol}\nQty: {qty}")
+    mark_symbol_traded(symbol)
 
-    except Exception as e:
-        tg(f"❌ ORDER FAILED {symbol}\n{e}")
+    # Market entries return at once; limit chase / TWAP run in the background
+    if EXEC_MODE == "MARKET" and qty * price < TWAP_MIN_NOTIONAL:
+        run_entry(symbol, side, qty, price, tp_price, sl_price)
+    else:
+        threading.Thread(
+            target=run_entry,
+            args=(symbol, side, qty, price, tp_price, sl_price),
+            daemon=True
+        ).start()
 
   # ======================================================
 # PART 5 – TRAILING STOP ENGINE
@@ -461,13 +806,96 @@ def update_stop_loss(symbol, new_sl):
         return False
 
 
+# ===============================
+# POSITION SYNC
+# ===============================
+
+FILL_WAIT_SECONDS = 60    # give up on entries never seen filled
+POSITION_PAGE = 200       # Bybit max per get_positions page (default 20)
+
+
+def get_open_positions():
+    """symbol -> position for every open linear USDT position, all pages"""
+    positions = {}
+    cursor = ""
+
+    while True:
+        r = session.get_positions(
+            category="linear",
+            settleCoin="USDT",
+            limit=POSITION_PAGE,
+            cursor=cursor
+        )
+        page = r["result"]["list"]
+        for p in page:
+            if float(p.get("size") or 0) > 0:
+                positions[p["symbol"]] = p
+
+        cursor = r["result"].get("nextPageCursor")
+        if not cursor or len(page) < POSITION_PAGE:
+            return positions
+
+
+def sync_positions():
+    """
+    One call for all symbols: records entry fills and
+    drops trades the exchange has closed (SL / TP hit)
+    """
+    if not OPEN_TRADES:
+        return
+
+    try:
+        positions = get_open_positions()
+    except:
+        return
+
+    for symbol, trade in list(OPEN_TRADES.items()):
+        if trade.get("pending"):
+            continue
+
+        pos = positions.get(symbol)
+
+        if pos is not None:
+            if "fill" not in trade:
+                trade["fill"] = float(pos["avgPrice"])
+                trade["qty"] = float(pos["size"])
+                journal_fill(symbol, trade["side"], trade["fill"], trade["qty"], trade["entry"])
+
+                exec_info = trade.pop("exec", None)
+                if exec_info:
+                    record_execution(
+                        exec_info["mode"], trade["side"], trade["entry"],
+                        trade["fill"], trade["qty"], exec_info["maker_qty"]
+                    )
+            continue
+
+        if "fill" not in trade:
+            if time.time() - trade.get("time", 0) > FILL_WAIT_SECONDS:
+                OPEN_TRADES.pop(symbol, None)
+            continue
+
+        exit_price = get_last_price(symbol) or trade["sl"]
+        direction = 1 if trade["side"] == "LONG" else -1
+        pnl = (exit_price - trade["fill"]) * trade["qty"] * direction
+
+        OPEN_TRADES.pop(symbol, None)
+        record_closed_pnl(pnl)
+        journal_close(symbol, trade["side"], exit_price, trade["qty"], trade["fill"], pnl)
+        tg(f"🏁 {trade['side']} CLOSED\n{symbol}\nPnL: {round(pnl, 4)}")
+
+
 # ===============================
 # TRAILING LOGIC
 # ===============================
 
 def manage_trailing():
     while True:
+        sync_positions()
+
         for symbol, trade in list(OPEN_TRADES.items()):
+            if trade.get("pending"):
+                continue
+
             try:
                 price = get_last_price(symbol)
                 if price is None:
@@ -489,6 +917,7 @@ def manage_trailing():
                         if new_sl > sl:
                             if update_stop_loss(symbol, new_sl):
                                 OPEN_TRADES[symbol]["sl"] = new_sl
+                                journal_sl(symbol, side, new_sl, price)
                                 tg(f"🔁 TRAIL SL ↑ {symbol}\nSL: {round(new_sl,4)}")
 
                 # ---------------------------
@@ -502,11 +931,13 @@ def manage_trailing():
                         if new_sl < sl:
                             if update_stop_loss(symbol, new_sl):
                                 OPEN_TRADES[symbol]["sl"] = new_sl
+                                journal_sl(symbol, side, new_sl, price)
                                 tg(f"🔁 TRAIL SL ↓ {symbol}\nSL: {round(new_sl,4)}")
 
             except:
                 pass
 
+        save_state()
         time.sleep(5)
 
   # ======================================================
@@ -529,142 +960,237 @@ SCAN_INTERVAL = 15   # seconds
 
 
 # ===============================
-# MARKET DATA HELPERS
+# MAIN SCAN LOOP
 # ===============================
 
-def get_last_price(symbol):
-    try:
-        r = session.get_tickers(
-            category="linear",
-            symbol=symbol
-        )
-        return float(r["result"]["list"][0]["lastPrice"])
-    except:
-        return None
+def scan_markets():
+    EXCHANGE_READY.wait()
+    tg("🧠 Market scan started")
 
+    while True:
+        if SHARD_CLIENT is not None:
+            sync_shard_state()
 
-def get_klines(symbol, interval="5", limit=50):
-    try:
-        r = session.get_kline(
-            category="linear",
-            symbol=symbol,
-            interval=interval,
-            limit=limit
-        )
-        return r["result"]["list"]
-    except:
-        return None
+        if not BOT_ACTIVE or KILL_SWITCH:
+            time.sleep(5)
+            continue
 
+        if SHARD_CLIENT is None:
+            daily_risk_check()
 
-# ===============================
-# INDICATOR CALCULATIONS
-# ===============================
+        started = time.time()
 
-def calculate_sma(data, length):
-    if len(data) < length:
-        return None
-    return sum(data[-length:]) / length
+        for symbol in TRADE_SYMBOLS:
+            if symbol in OPEN_TRADES:
+                SCAN_STATE[symbol] = "open trade"
+                continue
 
+            if not can_trade_symbol(symbol):
+                SCAN_STATE[symbol] = "cooldown"
+                continue
 
-def calculate_rsi(closes, period=14):
-    if len(closes) < period + 1:
-        return None
+            features = compute_features(symbol)
+            if features is None:
+                SCAN_STATE[symbol] = "no data"
+                continue
 
-    gains, losses = [], []
-    for i in range(1, period + 1):
-        diff = closes[-i] - closes[-i - 1]
-        if diff >= 0:
-            gains.append(diff)
-        else:
-            losses.append(abs(diff))
+            decision, snapshot = evaluate_strategies(symbol, features)
+            SCAN_STATE[symbol] = decision or "no signal"
 
-    if not losses:
-        return 100
+            if decision in ["LONG", "SHORT"]:
+                place_order(symbol, decision, snapshot)
 
-    rs = (sum(gains) / period) / (sum(losses) / period)
-    return 100 - (100 / (1 + rs))
+        record_scan(time.time() - started)
+        save_kline_cache()
+        time.sleep(SCAN_INTERVAL)
 
+      # ======================================================
+# PART 7 – TELEGRAM CONTROL & COMMANDS
+# ======================================================
 
-def calculate_atr(highs, lows, closes, period=14):
-    trs = []
-    for i in range(1, period + 1):
-        tr = max(
-            highs[-i] - lows[-i],
-            abs(highs[-i] - closes[-i - 1]),
-            abs(lows[-i] - closes[-i - 1])
-        )
-        trs.append(tr)
+# ===============================
+# COMMAND SETTINGS
+# ===============================
 
-    return sum(trs) / period if trs else None
+TG_WORKERS = 4
+TG_PAGE_SIZE = 10                        # /history rows per page
+TG_CONTROL = ("/start", "/stop", "/kill", "/reset")  # run inline, in arrival order
+
+TG_POOL = ThreadPoolExecutor(max_workers=TG_WORKERS)
 
 
 # ===============================
-# SNAPSHOT BUILDER
+# CACHED STATE VIEWS
 # ===============================
 
-def build_snapshot(symbol):
-    klines = get_klines(symbol)
-    if not klines:
-        return None
+def _age(ts):
+    return f"{int(time.time() - ts)}s ago" if ts else "never"
 
-    closes = [float(k[4]) for k in klines]
-    highs = [float(k[2]) for k in klines]
-    lows = [float(k[3]) for k in klines]
 
-    price = closes[-1]
+def live_price(symbol):
+    bid, ask = book_top(symbol)
+    if bid is not None:
+        return (bid + ask) / 2
+    cached = LAST_PRICES.get(symbol)
+    return cached[0] if cached else None
 
-    sma_fast = calculate_sma(closes, 9)
-    sma_slow = calculate_sma(closes, 21)
-    rsi_val = calculate_rsi(closes)
-    atr_val = calculate_atr(highs, lows, closes)
 
-    if not all([sma_fast, sma_slow, rsi_val, atr_val]):
-        return None
+def record_scan(duration):
+    SCAN_STATS["passes"] += 1
+    SCAN_STATS["last"] = duration
+    SCAN_STATS["total"] += duration
+    SCAN_STATS["max"] = max(SCAN_STATS["max"], duration)
+    SCAN_STATS["at"] = time.time()
+
 
+def state_view():
+    """This process's live state; also the shard heartbeat payload"""
     return {
-        "price": price,
-        "sma_fast": sma_fast,
-        "sma_slow": sma_slow,
-        "rsi": rsi_val,
-        "atr": atr_val
+        "symbols": TRADE_SYMBOLS,
+        "open_trades": dict(OPEN_TRADES),
+        "scan_stats": dict(SCAN_STATS),
+        "scan_state": {s: SCAN_STATE.get(s) for s in TRADE_SYMBOLS},
+        "signals": {s: STRATEGY_SIGNALS.get(s) for s in TRADE_SYMBOLS},
+        "exec_stats": {mode: dict(s) for mode, s in EXEC_STATS.items()},
+        "marks": {s: live_price(s) for s in list(OPEN_TRADES)},
+        "book_ages": [
+            time.time() - BOOKS[s]["updated"]
+            for s in TRADE_SYMBOLS if s in BOOKS and BOOKS[s]["valid"]
+        ]
     }
 
 
-# ===============================
-# MAIN SCAN LOOP
-# ===============================
+def state_views():
+    """(label, view): this process, then every live shard (coordinator)"""
+    views = [("", state_view())]
+    for shard, info in sorted(live_shards().items()):
+        views.append((f"shard {shard}", info))
+    return views
+
+
+def status_text():
+    balance, at = LAST_BALANCE or (None, None)
+    return (
+        f"📊 STATUS\n"
+        f"Mode: {MODE}\n"
+        f"Active: {BOT_ACTIVE}  Kill: {KILL_SWITCH}\n"
+        f"Balance: {balance} ({_age(at)})\n"
+        f"Trades today: {TRADES_TODAY}/{MAX_TRADES_PER_DAY}\n"
+        f"Realized PnL today: {round(DAILY_PNL, 4)}\n"
+        f"Open trades: {len(all_open_trades())}"
+    )
 
-def scan_markets():
-    tg("🧠 Market scan started")
 
-    while True:
-        if not BOT_ACTIVE or KILL_SWITCH:
-            time.sleep(5)
-            continue
+def all_open_trades():
+    trades = dict(OPEN_TRADES)
+    for info in live_shards().values():
+        trades.update(info.get("open_trades", {}))
+    return trades
 
-        daily_risk_check()
 
-        for symbol in TRADE_SYMBOLS:
-            if symbol in OPEN_TRADES:
-                continue
+def trades_text():
+    trades = all_open_trades()
+    if not trades:
+        return "📭 No open trades"
 
-            if not can_trade_symbol(symbol):
-                continue
+    marks = {}
+    for label, view in state_views():
+        marks.update(view["marks"])
 
-            snapshot = build_snapshot(symbol)
-            if snapshot is None:
-                continue
+    lines = ["📂 OPEN TRADES"]
+    for symbol, t in sorted(trades.items()):
+        entry = t.get("fill") or t["entry"]
+        price = marks.get(symbol)
 
-            decision = ai_trade_filter(symbol, snapshot)
+        if t.get("pending"):
+            pnl = "pending"
+        elif price is None:
+            pnl = "n/a"
+        else:
+            direction = 1 if t["side"] == "LONG" else -1
+            value = (price - entry) * t["qty"] * direction
+            pnl = f"{round(value, 4)} ({round((price / entry - 1) * 100 * direction, 2)}%)"
 
-            if decision in ["LONG", "SHORT"]:
-                place_order(symbol, decision, snapshot)
+        lines.append(
+            f"{symbol} {t['side']} {t['qty']} @ {round(entry, 4)}\n"
+            f"  SL {round(t['sl'], 4)}  PnL {pnl}"
+        )
+    return "\n".join(lines)
+
+
+def scan_text():
+    views = [(l, v) for l, v in state_views() if v["scan_stats"]["passes"]]
+    if not views:
+        return "🧠 No scan completed yet"
+
+    lines = []
+    for label, view in views:
+        stats = view["scan_stats"]
+        lines += [
+            f"🧠 SCAN{' ' + label if label else ''} ({_age(stats['at'])})",
+            f"Last pass: {round(stats['last'], 3)}s"
+        ]
+        for symbol in view["symbols"]:
+            state = view["scan_state"].get(symbol) or "-"
+            signals = view["signals"].get(symbol) or {}
+            fired = ", ".join(f"{n}={d}" for n, d in signals.items() if d)
+            lines.append(f"{symbol}: {state}" + (f" [{fired}]" if fired else ""))
+    return "\n".join(lines)
+
+
+def latency_text():
+    lines = ["⏱ LATENCY"]
+    views = state_views()
+
+    for label, view in views:
+        stats = view["scan_stats"]
+        if stats["passes"]:
+            lines.append(
+                f"Scan pass{' ' + label if label else ''}: last {round(stats['last'], 3)}s  "
+                f"avg {round(stats['total'] / stats['passes'], 3)}s  "
+                f"max {round(stats['max'], 3)}s  ({stats['passes']} passes)"
+            )
+
+    exec_stats = {}
+    for label, view in views:
+        for mode, s in view["exec_stats"].items():
+            merged = exec_stats.setdefault(mode, dict.fromkeys(s, 0))
+            for key, value in s.items():
+                merged[key] += value
+
+    for mode, r in execution_report(exec_stats).items():
+        lines.append(
+            f"{mode}: {r['entries']} entries  slip {round(r['avg_bps'], 2)} bps  "
+            f"maker {round(r['maker_share'] * 100)}%"
+        )
 
-        time.sleep(SCAN_INTERVAL)
+    ages = [age for label, view in views for age in view["book_ages"]]
+    if ages:
+        lines.append(f"Book age: max {round(max(ages), 2)}s over {len(ages)} books")
+
+    return "\n".join(lines) if len(lines) > 1 else "⏱ No latency data yet"
+
+
+def history_text(page):
+    journal_flush()
+    closes = journal_closes()
+    pages = max(1, math.ceil(len(closes) / TG_PAGE_SIZE))
+    page = min(max(1, page), pages)
+
+    if not closes:
+        return "📜 No closed trades in the journal"
+
+    lines = [f"📜 HISTORY {page}/{pages}"]
+    for c in closes[(page - 1) * TG_PAGE_SIZE:page * TG_PAGE_SIZE]:
+        when = datetime.utcfromtimestamp(c["ts"]).strftime("%m-%d %H:%M")
+        lines.append(
+            f"{when} {c['symbol']} {c['side']} "
+            f"{round(c['entry'], 4)} → {round(c['exit'], 4)}  PnL {round(c['pnl'], 4)}"
+        )
+    if page < pages:
+        lines.append(f"/history {page + 1} for more")
+    return "\n".join(lines)
 
-      # ======================================================
-# PART 7 – TELEGRAM CONTROL & COMMANDS
-# ======================================================
 
 # ===============================
 # TELEGRAM COMMAND HANDLER
@@ -673,7 +1199,9 @@ def scan_markets():
 def handle_command(text):
     global BOT_ACTIVE, KILL_SWITCH
 
-    cmd = text.lower().strip()
+    parts = text.lower().strip().split()
+    cmd = parts[0].split("@")[0] if parts else ""
+    args = parts[1:]
 
     if cmd == "/start":
         BOT_ACTIVE = True
@@ -689,26 +1217,58 @@ def handle_command(text):
         tg("🛑 KILL SWITCH ENABLED")
 
     elif cmd == "/status":
-        bal = get_balance()
-        tg(
-            f"📊 STATUS\n"
-            f"Mode: {MODE}\n"
-            f"Balance: {bal}\n"
-            f"Trades today: {TRADES_TODAY}\n"
-            f"Open trades: {len(OPEN_TRADES)}"
-        )
+        tg(status_text())
+
+    elif cmd == "/trades":
+        tg(trades_text())
+
+    elif cmd == "/scan":
+        tg(scan_text())
+
+    elif cmd == "/latency":
+        tg(latency_text())
+
+    elif cmd == "/history":
+        page = int(args[0]) if args and args[0].isdigit() else 1
+        tg(history_text(page))
 
     elif cmd == "/reset":
-        init_day()
-        tg("🔄 DAILY RESET DONE")
+        # counters in order with the other switches, balance off the poller
+        reset_day_counters()
+        TG_POOL.submit(refresh_day_balance)
+
+    elif cmd == "/help":
+        tg(
+            "/start /stop /kill /reset\n"
+            "/status /trades /scan /latency\n"
+            "/history [page]"
+        )
 
     else:
         tg("❓ Unknown command")
 
 
+def run_command(text):
+    try:
+        handle_command(text)
+    except Exception as e:
+        tg(f"❌ COMMAND FAILED\n{text}\n{e}")
+
+
+def dispatch_command(text):
+    """Switches run inline so they apply in order; queries go to the pool"""
+    parts = text.lower().strip().split()
+    cmd = parts[0].split("@")[0] if parts else ""
+
+    if cmd in TG_CONTROL:
+        run_command(text)
+    else:
+        TG_POOL.submit(run_command, text)
+
+
+# ===============================
+# TELEGRAM POLLING LOOP
 # ===============================
-# TELEGRAM POLLING LOOP
-# ===============================
 
 def start_telegram():
     if not TG_TOKEN or TG_ADMIN == 0:
@@ -720,9 +1280,10 @@ def start_telegram():
     offset = 0
     while True:
         try:
-            r = requests.get(
-                f"https://api.telegram.org/bot{TG_TOKEN}/getUpdates",
-                params={"offset": offset, "timeout": 30}
+            r = TG_HTTP.get(
+                f"{TG_API}/getUpdates",
+                params={"offset": offset, "timeout": 30},
+                timeout=40
             ).json()
 
             for update in r.get("result", []):
@@ -737,7 +1298,7 @@ def start_telegram():
 
                 text = update["message"].get("text", "")
                 if text:
-                    handle_command(text)
+                    dispatch_command(text)
 
         except Exception as e:
             time.sleep(3)
@@ -746,8 +1307,6 @@ def start_telegram():
 # PART 8 – MINI WEB UI (DASHBOARD)
 # ======================================================
 
-from flask import Flask, jsonify
-
 app = Flask(__name__)
 
 
@@ -761,9 +1320,11 @@ def api_status():
         "mode": MODE,
         "bot_active": BOT_ACTIVE,
         "kill_switch": KILL_SWITCH,
-        "balance": get_balance(),
+        "balance": LAST_BALANCE[0] if LAST_BALANCE else None,
         "trades_today": TRADES_TODAY,
-        "open_trades": OPEN_TRADES
+        "daily_pnl": DAILY_PNL,
+        "open_trades": OPEN_TRADES,
+        "shards": live_shards()
     })
 
 
@@ -801,20 +1362,1899 @@ def start_web():
     app.run(host="0.0.0.0", port=10000)
 
 # ======================================================
-# PART 9 – THREADS & MAIN RUNNER
+# PART 9 – TRADE JOURNAL (COLUMNAR, APPEND-ONLY)
 # ======================================================
 
-if __name__ == "__main__":
-    # ---- INIT DAY ----
-    init_day()
+# ===============================
+# JOURNAL SETTINGS
+# ===============================
+
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "journal")
+JOURNAL_FLUSH_SECONDS = 5
+JOURNAL_FLUSH_ROWS = 512
+
+# Row kinds
+J_DECISION = 1   # filter run (carries the snapshot)
+J_ORDER = 2      # order sent, price = signal price
+J_FILL = 3       # entry filled, price = avg fill, ref = signal price
+J_SL = 4         # trailing SL moved, price = new SL, ref = last price
+J_CLOSE = 5      # trade closed, price = exit, ref = fill, pnl set
+
+J_KIND_NAMES = {
+    J_DECISION: "DECISION",
+    J_ORDER: "ORDER",
+    J_FILL: "FILL",
+    J_SL: "SL",
+    J_CLOSE: "CLOSE"
+}
+
+# Filter outcome codes (DECISION rows)
+J_REASONS = ["SIGNAL", "NO_DATA", "ATR", "NO_SETUP", "BOOK"]
+
+# One file per column per day: journal/YYYY-MM-DD/<column>.col
+JOURNAL_COLUMNS = {
+    "ts": "d",
+    "kind": "B",
+    "symbol": "H",   # index into journal/symbols.json
+    "strategy": "H", # index into journal/strategies.json (DECISION rows)
+    "side": "b",     # 1 LONG, -1 SHORT, 0 none
+    "code": "B",
+    "price": "d",
+    "qty": "d",
+    "ref": "d",
+    "rsi": "d",
+    "atr": "d",
+    "pnl": "d"
+}
+
+NAN = float("nan")
+
+JOURNAL_LOCK = threading.Lock()
+JOURNAL_WAKE = threading.Event()
+JOURNAL_BUFFER = {name: array(code) for name, code in JOURNAL_COLUMNS.items()}
+JOURNAL_DAY = None
+
+# String columns -> dictionary file and its fixed first entries.
+# Strategy 0 is "" (no strategy), which is also what the reader
+# fills in for days written before the column existed.
+JOURNAL_DICTS = {
+    "symbol": ("symbols.json", []),
+    "strategy": ("strategies.json", [""])
+}
+JOURNAL_NAMES = {}   # column -> {name: index}, loaded on first use
+
+
+# ===============================
+# NAME DICTIONARIES
+# ===============================
+
+def _journal_dict_path(column, root=None):
+    return os.path.join(root or JOURNAL_DIR, JOURNAL_DICTS[column][0])
+
+
+def load_journal_dict(column, root=None):
+    try:
+        with open(_journal_dict_path(column, root)) as f:
+            return json.load(f)
+    except:
+        return list(JOURNAL_DICTS[column][1])
+
+
+def load_journal_symbols(root=None):
+    return load_journal_dict("symbol", root)
+
+
+def _journal_name_index(column, name):
+    names = JOURNAL_NAMES.get(column)
+    if names is None:
+        names = {n: i for i, n in enumerate(load_journal_dict(column))}
+        JOURNAL_NAMES[column] = names
+
+    idx = names.get(name)
+    if idx is None:
+        idx = len(names)
+        names[name] = idx
+    return idx
+
+
+# ===============================
+# HOT PATH WRITERS
+# ===============================
+
+def journal_write(kind, symbol, side=None, code=0, price=NAN, qty=NAN,
+                  ref=NAN, rsi=NAN, atr=NAN, pnl=NAN, strategy=""):
+    global JOURNAL_DAY
+
+    now = time.time()
+    day = datetime.utcfromtimestamp(now).strftime("%Y-%m-%d")
+
+    with JOURNAL_LOCK:
+        if JOURNAL_DAY is not None and day != JOURNAL_DAY:
+            # day roll: a disk error must not reach the scan / trailing loop
+            try:
+                _journal_flush_locked()
+            except Exception as e:
+                print(f"Journal flush failed: {e}")
+        JOURNAL_DAY = day
+
+        b = JOURNAL_BUFFER
+        b["ts"].append(now)
+        b["kind"].append(kind)
+        b["symbol"].append(_journal_name_index("symbol", symbol))
+        b["strategy"].append(_journal_name_index("strategy", strategy or ""))
+        b["side"].append(1 if side == "LONG" else -1 if side == "SHORT" else 0)
+        b["code"].append(code)
+        b["price"].append(price if price is not None else NAN)
+        b["qty"].append(qty if qty is not None else NAN)
+        b["ref"].append(ref if ref is not None else NAN)
+        b["rsi"].append(rsi if rsi is not None else NAN)
+        b["atr"].append(atr if atr is not None else NAN)
+        b["pnl"].append(pnl if pnl is not None else NAN)
+
+        if len(b["ts"]) >= JOURNAL_FLUSH_ROWS:
+            JOURNAL_WAKE.set()
+
+
+def journal_decision(symbol, snapshot, decision, reason):
+    """Tagged with the strategy evaluate_strategies is running"""
+    STRATEGY_CONTEXT.journaled = True
+    snapshot = snapshot or {}
+    journal_write(
+        J_DECISION, symbol, decision, J_REASONS.index(reason),
+        price=snapshot.get("price"),
+        rsi=snapshot.get("rsi"),
+        atr=snapshot.get("atr"),
+        strategy=getattr(STRATEGY_CONTEXT, "name", None)
+    )
+
+
+def journal_order(symbol, side, price, qty):
+    journal_write(J_ORDER, symbol, side, price=price, qty=qty, ref=price)
+
+
+def journal_fill(symbol, side, fill_price, qty, signal_price):
+    journal_write(J_FILL, symbol, side, price=fill_price, qty=qty, ref=signal_price)
+
+
+def journal_sl(symbol, side, new_sl, last_price):
+    journal_write(J_SL, symbol, side, price=new_sl, ref=last_price)
+
+
+def journal_close(symbol, side, exit_price, qty, fill_price, pnl):
+    journal_write(J_CLOSE, symbol, side, price=exit_price, qty=qty, ref=fill_price, pnl=pnl)
+
+
+# ===============================
+# SEGMENT WRITER
+# ===============================
+
+def _journal_flush_locked():
+    global JOURNAL_BUFFER
+
+    if JOURNAL_DAY is None or not JOURNAL_BUFFER["ts"]:
+        return
+
+    buf = JOURNAL_BUFFER
+    JOURNAL_BUFFER = {name: array(code) for name, code in JOURNAL_COLUMNS.items()}
+
+    path = os.path.join(JOURNAL_DIR, JOURNAL_DAY)
+    os.makedirs(path, exist_ok=True)
+
+    # dictionaries first, so a reader never sees an unknown index
+    for column, names in JOURNAL_NAMES.items():
+        ordered = sorted(names, key=names.get)
+        if len(ordered) != len(load_journal_dict(column)):
+            tmp = _journal_dict_path(column) + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(ordered, f)
+            os.replace(tmp, _journal_dict_path(column))
+
+    # a column file that is short (new column, or an interrupted
+    # flush) is zero-padded to the ts row count to stay aligned
+    rows = _journal_col_rows(path, "ts")
+
+    for name, col in buf.items():
+        missing = rows - _journal_col_rows(path, name)
+        with open(os.path.join(path, name + ".col"), "ab") as f:
+            if missing > 0:
+                (array(JOURNAL_COLUMNS[name], [0]) * missing).tofile(f)
+            col.tofile(f)
+
+
+def _journal_col_rows(path, name):
+    try:
+        size = os.path.getsize(os.path.join(path, name + ".col"))
+    except FileNotFoundError:
+        return 0
+    return size // array(JOURNAL_COLUMNS[name]).itemsize
+
+
+def journal_flush():
+    with JOURNAL_LOCK:
+        try:
+            _journal_flush_locked()
+        except Exception as e:
+            print(f"Journal flush failed: {e}")
+
+
+def journal_writer():
+    while True:
+        JOURNAL_WAKE.wait(JOURNAL_FLUSH_SECONDS)
+        JOURNAL_WAKE.clear()
+        journal_flush()
+
+
+def start_journal():
+    """Writer thread, plus a final flush on normal exit and on SIGTERM"""
+    atexit.register(journal_flush)
+
+    # SIGTERM -> SystemExit in the main thread, so atexit handlers run
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
-    # ---- TELEGRAM THREAD ----
     threading.Thread(
-        target=start_telegram,
+        target=journal_writer,
+        daemon=True
+    ).start()
+
+
+# ===============================
+# READERS (MEMORY-MAPPED)
+# ===============================
+
+def journal_roots():
+    """The main journal plus one sub-journal per shard process"""
+    try:
+        shards = sorted(d for d in os.listdir(JOURNAL_DIR) if d.startswith("shard-"))
+    except FileNotFoundError:
+        return []
+    return [JOURNAL_DIR] + [os.path.join(JOURNAL_DIR, d) for d in shards]
+
+
+def journal_days(days=None, root=None):
+    root = root or JOURNAL_DIR
+    try:
+        names = sorted(
+            d for d in os.listdir(root)
+            if len(d) == 10 and os.path.isdir(os.path.join(root, d))
+        )
+    except FileNotFoundError:
+        return []
+
+    if days:
+        names = names[-days:]
+    return names
+
+
+def journal_open_day(day, root=None):
+    """
+    Returns {column: memoryview} over the mapped segment files,
+    trimmed to the rows present in every column. Columns added
+    after the day was written read as zeros.
+    """
+    path = os.path.join(root or JOURNAL_DIR, day)
+    cols = {}
+
+    for name, code in JOURNAL_COLUMNS.items():
+        try:
+            with open(os.path.join(path, name + ".col"), "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            if name == "ts":
+                return None
+            continue
+
+        raw = memoryview(mm)
+        size = array(code).itemsize
+        cols[name] = raw[:len(raw) - len(raw) % size].cast(code)
+
+    rows = min(len(c) for c in cols.values())
+    for name, code in JOURNAL_COLUMNS.items():
+        if name not in cols:
+            cols[name] = memoryview(array(code, [0]) * rows)
+    return {name: col[:rows] for name, col in cols.items()}
+
+
+def journal_rows(cols, kind):
+    """Row indices of one kind (fast byte search over the kind column)"""
+    kinds = cols["kind"].tobytes()
+    marker = bytes([kind])
+    i = kinds.find(marker)
+    while i != -1:
+        yield i
+        i = kinds.find(marker, i + 1)
+
+
+def journal_scan(kind, days=None, symbol=None, strategy=None):
+    """Yields (symbols, cols, row) for every row of one kind"""
+    for root in journal_roots():
+        symbols = load_journal_symbols(root)
+        want = symbols.index(symbol) if symbol in symbols else None
+        if symbol and want is None:
+            continue
+
+        strategies = load_journal_dict("strategy", root)
+        want_strategy = strategies.index(strategy) if strategy in strategies else None
+        if strategy and want_strategy is None:
+            continue
+
+        for day in journal_days(days, root):
+            cols = journal_open_day(day, root)
+            if cols is None:
+                continue
+            sym_col = cols["symbol"]
+            strategy_col = cols["strategy"]
+            for i in journal_rows(cols, kind):
+                if want is not None and sym_col[i] != want:
+                    continue
+                if want_strategy is not None and strategy_col[i] != want_strategy:
+                    continue
+                yield symbols, cols, i
+
+
+# ===============================
+# ANALYTICS
+# ===============================
+
+def journal_win_rate(days=None, symbol=None):
+    """symbol -> {"trades", "wins", "win_rate", "pnl"}"""
+    out = {}
+    for symbols, cols, i in journal_scan(J_CLOSE, days, symbol):
+        s = out.setdefault(symbols[cols["symbol"][i]], {"trades": 0, "wins": 0, "pnl": 0.0})
+        pnl = cols["pnl"][i]
+        s["trades"] += 1
+        s["wins"] += pnl > 0
+        s["pnl"] += pnl
+
+    for s in out.values():
+        s["win_rate"] = s["wins"] / s["trades"]
+    return out
+
+
+def journal_slippage(days=None, symbol=None):
+    """symbol -> {"fills", "avg_bps"}; positive = filled worse than signal"""
+    out = {}
+    for symbols, cols, i in journal_scan(J_FILL, days, symbol):
+        ref = cols["ref"][i]
+        if not ref or ref != ref:
+            continue
+        bps = (cols["price"][i] - ref) / ref * 10000 * cols["side"][i]
+        s = out.setdefault(symbols[cols["symbol"][i]], {"fills": 0, "total_bps": 0.0})
+        s["fills"] += 1
+        s["total_bps"] += bps
+
+    for s in out.values():
+        s["avg_bps"] = s.pop("total_bps") / s["fills"]
+    return out
+
+
+def journal_closes(days=None, symbol=None):
+    """Closed trades, newest first"""
+    out = []
+    for symbols, cols, i in journal_scan(J_CLOSE, days, symbol):
+        out.append({
+            "ts": cols["ts"][i],
+            "symbol": symbols[cols["symbol"][i]],
+            "side": "LONG" if cols["side"][i] > 0 else "SHORT",
+            "entry": cols["ref"][i],
+            "exit": cols["price"][i],
+            "qty": cols["qty"][i],
+            "pnl": cols["pnl"][i]
+        })
+    out.sort(key=lambda c: c["ts"], reverse=True)
+    return out
+
+
+def journal_filter_stats(days=None, symbol=None, strategy=None):
+    """reason -> {"count", "rate"} over all filter runs (of one strategy)"""
+    counts = [0] * len(J_REASONS)
+    for symbols, cols, i in journal_scan(J_DECISION, days, symbol, strategy):
+        counts[cols["code"][i]] += 1
+
+    total = sum(counts) or 1
+    return {
+        reason: {"count": counts[n], "rate": counts[n] / total}
+        for n, reason in enumerate(J_REASONS)
+    }
+
+
+# ===============================
+# CLI
+# ===============================
+
+def journal_cli(argv):
+    parser = argparse.ArgumentParser(prog="bybit_bot.py journal")
+    parser.add_argument("report", nargs="?", default="all",
+                        choices=["all", "winrate", "slippage", "filters"])
+    parser.add_argument("--days", type=int, default=None, help="last N journal days")
+    parser.add_argument("--symbol", default=None)
+    parser.add_argument("--strategy", default=None, help="filter outcomes of one strategy")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+
+    if args.report in ("all", "winrate"):
+        print("== WIN RATE ==")
+        for sym, s in sorted(journal_win_rate(args.days, args.symbol).items()):
+            print(f"{sym:<12} trades {s['trades']:>5}  win {s['win_rate'] * 100:6.2f}%  pnl {s['pnl']:.4f}")
+
+    if args.report in ("all", "slippage"):
+        print("== SLIPPAGE vs SIGNAL ==")
+        for sym, s in sorted(journal_slippage(args.days, args.symbol).items()):
+            print(f"{sym:<12} fills {s['fills']:>5}  avg {s['avg_bps']:8.2f} bps")
+
+    if args.report in ("all", "filters"):
+        print("== FILTER OUTCOMES ==")
+        for reason, s in journal_filter_stats(args.days, args.symbol, args.strategy).items():
+            print(f"{reason:<12} {s['count']:>8}  {s['rate'] * 100:6.2f}%")
+
+    print(f"({round(time.time() - started, 3)}s)")
+
+# ======================================================
+# PART 10 – SMART ORDER EXECUTION
+# ======================================================
+
+# ===============================
+# EXECUTION SETTINGS
+# ===============================
+
+EXEC_MODE = os.getenv("EXEC_MODE", "CHASE")   # CHASE (post-only) or MARKET
+
+EXEC_CHASE_TIMEOUT = 20     # seconds before falling back to market
+EXEC_REPRICE_SECONDS = 1    # top-of-book poll / reprice interval
+EXEC_MAX_CHASE_BPS = 15     # price ran this far against the order -> take market
+EXEC_STATUS_RETRIES = 5     # lookups of a cancelled order's final state
+
+TWAP_MIN_NOTIONAL = 5000    # USDT, slice entries at or above this
+TWAP_SLICES = 5
+TWAP_INTERVAL = 10          # seconds between slices
+
+EXEC_DONE = ("Filled", "Cancelled", "Rejected", "Deactivated", "PartiallyFilledCanceled")
+
+EXEC_STATS = {
+    "CHASE": {"entries": 0, "qty": 0.0, "bps_qty": 0.0, "maker_qty": 0.0},
+    "MARKET": {"entries": 0, "qty": 0.0, "bps_qty": 0.0, "maker_qty": 0.0}
+}
+
+
+# ===============================
+# TOP OF BOOK / ORDER STATUS
+# ===============================
+
+def get_top_of_book(symbol):
+    bid, ask = book_top(symbol)
+    if bid is not None:
+        return bid, ask
+
+    try:
+        r = session.get_orderbook(category="linear", symbol=symbol, limit=1)
+        book = r["result"]
+        return float(book["b"][0][0]), float(book["a"][0][0])
+    except:
+        return None, None
+
+
+def get_order_status(symbol, order_id):
+    """Returns (status, filled_qty, avg_price)"""
+    try:
+        r = session.get_open_orders(category="linear", symbol=symbol, orderId=order_id)
+        o = r["result"]["list"][0]
+        return o["orderStatus"], float(o["cumExecQty"] or 0), float(o["avgPrice"] or 0)
+    except:
+        return None, 0.0, 0.0
+
+
+def final_order_status(symbol, order_id):
+    """get_order_status with retries; status None = state still unknown"""
+    for attempt in range(EXEC_STATUS_RETRIES):
+        status, filled, avg = get_order_status(symbol, order_id)
+        if status is not None:
+            return status, filled, avg
+        time.sleep(EXEC_REPRICE_SECONDS)
+    return None, 0.0, 0.0
+
+
+# ===============================
+# MARKET ENTRY
+# ===============================
+
+def market_entry(symbol, order_side, qty, tp, sl):
+    r = session.place_order(
+        category="linear",
+        symbol=symbol,
+        side=order_side,
+        orderType="Market",
+        qty=qty,
+        takeProfit=round(tp, 4),
+        stopLoss=round(sl, 4),
+        timeInForce="GoodTillCancel",
+        reduceOnly=False,
+        closeOnTrigger=False
+    )
+
+    status, filled, avg = get_order_status(symbol, r["result"]["orderId"])
+    if not filled:
+        # status not visible yet: market orders fill, price comes from position sync
+        return None, qty
+    return avg, filled
+
+
+# ===============================
+# POST-ONLY CHASE ENTRY
+# ===============================
+
+def chase_entry(symbol, order_side, qty, signal_price, tp, sl, timeout=None):
+    """
+    Post-only limit at best bid (Buy) / best ask (Sell), repriced while
+    the book moves, market for the rest on timeout or once price runs
+    EXEC_MAX_CHASE_BPS against the order (a move in its favour waits).
+    Returns (avg_price, filled_qty, maker_qty); avg_price is None when
+    part of the fill has no visible price, filled_qty is None when the
+    last resting order's state is unknown (nothing is sent at market
+    then - sync_positions reconciles from the position).
+    """
+    deadline = time.time() + (timeout or EXEC_CHASE_TIMEOUT)
+    direction = 1 if order_side == "Buy" else -1
+    done_qty, done_cost = 0.0, 0.0
+    price_known = True
+    order_id, order_price = None, None
+
+    def settle(filled, avg):
+        nonlocal done_qty, done_cost, price_known, order_id
+        done_qty += filled
+        if filled and not avg:
+            price_known = False
+        done_cost += filled * avg
+        order_id = None
+
+    while time.time() < deadline:
+        remaining = round_qty(symbol, qty - done_qty)
+        if not remaining or remaining <= 0:
+            break
+
+        bid, ask = get_top_of_book(symbol)
+        if bid is None:
+            time.sleep(EXEC_REPRICE_SECONDS)
+            continue
+
+        best = bid if order_side == "Buy" else ask
+        if (best - signal_price) * direction / signal_price * 10000 > EXEC_MAX_CHASE_BPS:
+            break
+
+        try:
+            if order_id is None:
+                r = session.place_order(
+                    category="linear",
+                    symbol=symbol,
+                    side=order_side,
+                    orderType="Limit",
+                    qty=remaining,
+                    price=str(best),
+                    takeProfit=round(tp, 4),
+                    stopLoss=round(sl, 4),
+                    timeInForce="PostOnly",
+                    reduceOnly=False,
+                    closeOnTrigger=False
+                )
+                order_id, order_price = r["result"]["orderId"], best
+            elif best != order_price:
+                session.amend_order(
+                    category="linear",
+                    symbol=symbol,
+                    orderId=order_id,
+                    price=str(best)
+                )
+                order_price = best
+        except:
+            pass
+
+        time.sleep(EXEC_REPRICE_SECONDS)
+
+        if order_id is not None:
+            status, filled, avg = get_order_status(symbol, order_id)
+            if status in EXEC_DONE:
+                # post-only rejects (would cross) also land here -> re-post
+                settle(filled, avg)
+
+    # ---- timeout / runaway: cancel and take the rest ----
+    if order_id is not None:
+        try:
+            session.cancel_order(category="linear", symbol=symbol, orderId=order_id)
+        except:
+            pass
+        status, filled, avg = final_order_status(symbol, order_id)
+        if status is None:
+            # it may have filled: a market top-up could double the position
+            return None, None, done_qty
+        settle(filled, avg)
+
+    maker_qty = done_qty
+    remaining = round_qty(symbol, qty - done_qty)
+
+    if remaining and remaining > 0:
+        avg, filled = market_entry(symbol, order_side, remaining, tp, sl)
+        done_qty += filled
+        if avg is None:
+            price_known = False
+        else:
+            done_cost += filled * avg
+
+    if done_qty <= 0:
+        return None, 0.0, 0.0
+    if not price_known:
+        return None, done_qty, maker_qty
+    return done_cost / done_qty, done_qty, maker_qty
+
+
+# ===============================
+# TWAP SLICING
+# ===============================
+
+def twap_slices(symbol, qty):
+    """
+    Slice sizes floored to the contract step, the last one takes the
+    remainder; a single order when a slice would be under min_qty
+    """
+    slices = max(1, TWAP_SLICES)
+    part = round_qty(symbol, qty / slices)
+    if slices == 1 or not part or part <= 0:
+        return [qty]
+
+    last = round_qty(symbol, qty - part * (slices - 1))
+    if not last:
+        return [qty]
+    return [part] * (slices - 1) + [last]
+
+
+def twap_entry(symbol, order_side, qty, signal_price, tp, sl):
+    """Same return contract as chase_entry"""
+    parts = twap_slices(symbol, qty)
+    done_qty, done_cost, maker_qty = 0.0, 0.0, 0.0
+    price_known = True
+
+    for n, part in enumerate(parts):
+        if EXEC_MODE == "MARKET":
+            avg, filled = market_entry(symbol, order_side, part, tp, sl)
+            made = 0.0
+        else:
+            avg, filled, made = chase_entry(
+                symbol, order_side, part, signal_price, tp, sl,
+                timeout=min(EXEC_CHASE_TIMEOUT, TWAP_INTERVAL)
+            )
+
+        maker_qty += made
+        if filled is None:
+            return None, None, maker_qty   # size unknown: stop slicing
+
+        done_qty += filled
+        if avg is None:
+            price_known = False
+        else:
+            done_cost += filled * avg
+
+        if n < len(parts) - 1:
+            time.sleep(TWAP_INTERVAL)
+
+    if done_qty <= 0:
+        return None, 0.0, 0.0
+    if not price_known:
+        return None, done_qty, maker_qty
+    return done_cost / done_qty, done_qty, maker_qty
+
+
+# ===============================
+# ENTRY ROUTER
+# ===============================
+
+def execute_entry(symbol, order_side, qty, signal_price, tp, sl):
+    """
+    Returns (avg_fill_price, filled_qty, maker_qty); None = not known yet.
+    Only entries with a known fill price go into EXEC_STATS here, the
+    rest are recorded by sync_positions once it sees avgPrice.
+    """
+    if qty * signal_price >= TWAP_MIN_NOTIONAL:
+        avg, filled, maker_qty = twap_entry(symbol, order_side, qty, signal_price, tp, sl)
+    elif EXEC_MODE == "MARKET":
+        avg, filled = market_entry(symbol, order_side, qty, tp, sl)
+        maker_qty = 0.0
+    else:
+        avg, filled, maker_qty = chase_entry(symbol, order_side, qty, signal_price, tp, sl)
+
+    if avg and filled:
+        side = "LONG" if order_side == "Buy" else "SHORT"
+        record_execution(exec_mode(), side, signal_price, avg, filled, maker_qty)
+
+    return avg, filled, maker_qty
+
+
+def exec_mode():
+    return "MARKET" if EXEC_MODE == "MARKET" else "CHASE"
+
+
+def run_entry(symbol, side, qty, signal_price, tp, sl):
+    order_side = "Buy" if side == "LONG" else "Sell"
+
+    try:
+        fill_price, filled_qty, maker_qty = execute_entry(symbol, order_side, qty, signal_price, tp, sl)
+    except Exception as e:
+        fill_price, filled_qty, maker_qty = None, 0, 0.0
+        tg(f"❌ ORDER FAILED {symbol}\n{e}")
+
+    trade = OPEN_TRADES.get(symbol)
+    if trade is None:
+        return
+
+    if filled_qty is not None and filled_qty <= 0:
+        OPEN_TRADES.pop(symbol, None)
+        release_trade_slot()
+        return
+
+    if filled_qty is not None:
+        trade["qty"] = filled_qty
+
+    if fill_price:
+        trade["fill"] = fill_price
+        journal_fill(symbol, side, fill_price, filled_qty, signal_price)
+    else:
+        # size and / or price not visible: taken from the position later
+        trade["exec"] = {"mode": exec_mode(), "maker_qty": maker_qty}
+    trade.pop("pending", None)
+
+    tg(
+        f"📈 {side} OPENED\n{symbol}\n"
+        f"Qty: {filled_qty or 'syncing'}\nFill: {fill_price or 'syncing'}"
+    )
+
+
+# ===============================
+# EXECUTION QUALITY
+# ===============================
+
+def record_execution(mode, side, signal_price, fill_price, qty, maker_qty):
+    direction = 1 if side == "LONG" else -1
+    bps = (fill_price - signal_price) / signal_price * 10000 * direction
+
+    s = EXEC_STATS[mode]
+    s["entries"] += 1
+    s["qty"] += qty
+    s["bps_qty"] += bps * qty
+    s["maker_qty"] += maker_qty
+
+
+def execution_report(stats=None):
+    """Avg slippage vs signal price (bps, qty weighted) per execution mode"""
+    out = {}
+    for mode, s in (stats or EXEC_STATS).items():
+        if not s["qty"]:
+            continue
+        out[mode] = {
+            "entries": s["entries"],
+            "avg_bps": s["bps_qty"] / s["qty"],
+            "maker_share": s["maker_qty"] / s["qty"]
+        }
+    return out
+
+# ======================================================
+# PART 11 – L2 ORDERBOOK (WEBSOCKET)
+# ======================================================
+
+# ===============================
+# ORDERBOOK SETTINGS
+# ===============================
+
+BOOK_DEPTH = 50              # orderbook.50.<symbol>
+BOOK_DEPTH_BPS = 20          # window for depth / imbalance features
+BOOK_MAX_DEPTH_SHARE = 0.25  # max share of that depth one entry may take
+BOOK_MAX_SPREAD_BPS = 10     # skip entries on wider spreads
+BOOK_MAX_IMBALANCE = 0.6     # skip entries against this much imbalance
+BOOK_STALE_SECONDS = 10
+
+BOOKS = {}       # symbol -> book dict
+BOOK_LOCK = threading.Lock()
+BOOK_WS = None
+
+
+# ===============================
+# ARRAY-BACKED BOOK
+# ===============================
+#
+# Each side is a pair of sorted arrays (keys, sizes). Bid keys are the
+# prices, ask keys are the negated prices, so both sides are ascending
+# and the best level is always the LAST element: O(1) top of book and
+# a short walk down from the end for depth.
+
+BOOK_RESYNC_GRACE = 2.0   # seconds to wait for a fresh snapshot after a gap
+
+
+def new_book():
+    return {
+        "bid_px": array("d"), "bid_sz": array("d"),
+        "ask_px": array("d"), "ask_sz": array("d"),
+        "u": 0,
+        "seq": 0,
+        "valid": False,
+        "resync_at": 0.0,
+        "updated": 0.0
+    }
+
+
+def _book_load(book, data):
+    bids = sorted((float(p), float(q)) for p, q in data.get("b", []) if float(q) > 0)
+    asks = sorted((-float(p), float(q)) for p, q in data.get("a", []) if float(q) > 0)
+
+    book["bid_px"] = array("d", (k for k, _ in bids))
+    book["bid_sz"] = array("d", (q for _, q in bids))
+    book["ask_px"] = array("d", (k for k, _ in asks))
+    book["ask_sz"] = array("d", (q for _, q in asks))
+    book["u"] = int(data.get("u", 0))
+    book["seq"] = int(data.get("seq", 0))
+    book["valid"] = True
+    book["updated"] = time.time()
+
+
+def _book_crossed(book):
+    return (
+        book["bid_px"] and book["ask_px"] and
+        book["bid_px"][-1] >= -book["ask_px"][-1]
+    )
+
+
+# ===============================
+# SEQUENCE CHECK + RESUBSCRIBE
+# ===============================
+#
+# pybit merges deltas into its own copy of the book and always calls
+# back with type="snapshot" and the full merged book, so every message
+# is loaded as a whole book. What pybit does not check is the update id:
+# each message must carry u == previous u + 1 (u == 1 is Bybit's restart
+# snapshot). On a gap or a crossed book the book is invalidated and the
+# topic resubscribed, so the next full book comes from a fresh WS
+# snapshot on the same update-id feed.
+
+def resubscribe_book(symbol):
+    """
+    Raw unsubscribe + subscribe for one topic. No req_id: pybit only
+    looks up req_ids it issued itself.
+    """
+    topic = f"orderbook.{BOOK_DEPTH}.{symbol}"
+    try:
+        for op in ("unsubscribe", "subscribe"):
+            BOOK_WS.ws.send(json.dumps({"op": op, "args": [topic]}))
+    except Exception as e:
+        print(f"Book resubscribe failed {symbol}: {e}")
+
+
+def on_orderbook(msg):
+    data = msg.get("data") or {}
+    symbol = data.get("s")
+    if not symbol:
+        return
+
+    u = int(data.get("u", 0))
+    resync = False
+
+    with BOOK_LOCK:
+        book = BOOKS.setdefault(symbol, new_book())
+
+        if not book["valid"]:
+            if time.time() < book["resync_at"]:
+                return   # still merged from the broken book
+            _book_load(book, data)
+        elif u == book["u"]:
+            return       # duplicate
+        elif u == book["u"] + 1 or u == 1:
+            _book_load(book, data)
+        else:
+            resync = True
+
+        if resync or _book_crossed(book):
+            book["valid"] = False
+            book["resync_at"] = time.time() + BOOK_RESYNC_GRACE
+            resync = True
+
+    if resync:
+        resubscribe_book(symbol)
+
+
+def start_orderbook_stream(symbols):
+    global BOOK_WS
+
+    try:
+        BOOK_WS = WebSocket(testnet=TESTNET, channel_type="linear")
+        BOOK_WS.orderbook_stream(BOOK_DEPTH, list(symbols), on_orderbook)
+    except Exception as e:
+        print(f"Orderbook stream disabled: {e}")
+
+
+# ===============================
+# FEATURES
+# ===============================
+
+def _live_book(symbol):
+    book = BOOKS.get(symbol)
+    if (
+        book is None or not book["valid"] or
+        not book["bid_px"] or not book["ask_px"] or
+        time.time() - book["updated"] > BOOK_STALE_SECONDS
+    ):
+        return None
+    return book
+
+
+def _depth_from_top(keys, sizes, limit_key):
+    """USDT notional from the best level down to limit_key"""
+    total = 0.0
+    i = len(keys) - 1
+    while i >= 0 and keys[i] >= limit_key:
+        total += abs(keys[i]) * sizes[i]
+        i -= 1
+    return total
+
+
+def book_top(symbol):
+    with BOOK_LOCK:
+        book = _live_book(symbol)
+        if book is None:
+            return None, None
+        return book["bid_px"][-1], -book["ask_px"][-1]
+
+
+def book_features(symbol, bps=None):
+    """
+    Returns None without a fresh, validated book, else
+    best bid/ask, spread (bps), USDT depth per side within
+    `bps` of mid, and imbalance in [-1, 1] (positive = bid heavy)
+    """
+    bps = bps or BOOK_DEPTH_BPS
+
+    with BOOK_LOCK:
+        book = _live_book(symbol)
+        if book is None:
+            return None
+
+        bid = book["bid_px"][-1]
+        ask = -book["ask_px"][-1]
+        mid = (bid + ask) / 2
+        window = mid * bps / 10000
+
+        bid_depth = _depth_from_top(book["bid_px"], book["bid_sz"], mid - window)
+        ask_depth = _depth_from_top(book["ask_px"], book["ask_sz"], -(mid + window))
+
+    total = bid_depth + ask_depth
+    return {
+        "bid": bid,
+        "ask": ask,
+        "spread_bps": (ask - bid) / mid * 10000,
+        "bid_depth": bid_depth,
+        "ask_depth": ask_depth,
+        "imbalance": (bid_depth - ask_depth) / total if total else 0.0
+    }
+
+# ======================================================
+# PART 12 – FAST STARTUP & WARM STATE
+# ======================================================
+
+# ===============================
+# STATE SETTINGS
+# ===============================
+
+STATE_DIR = os.getenv("STATE_DIR", "state")
+
+STATE_FILE = os.path.join(STATE_DIR, "bot_state.json")
+KLINE_CACHE_FILE = os.path.join(STATE_DIR, "klines.json")
+INSTRUMENTS_FILE = os.path.join(STATE_DIR, "instruments.json")
+
+INSTRUMENTS = {}   # symbol -> {"qty_step", "min_qty", "tick"}
+
+QTY_TOLERANCE = Decimal("1e-9")   # in steps, see round_qty
+
+RESTORED_PENDING = set()   # entries whose executor died with the old process
+
+
+def _today():
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def _write_json(path, data):
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"State write failed {path}: {e}")
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except:
+        return None
+
+
+# ===============================
+# TRADE STATE
+# ===============================
+
+def save_state():
+    _write_json(STATE_FILE, {
+        "day": _today(),
+        "start_day_balance": START_DAY_BALANCE,
+        "trades_today": TRADES_TODAY,
+        "daily_pnl": DAILY_PNL,
+        "kill_switch": KILL_SWITCH,
+        "bot_active": BOT_ACTIVE,
+        "open_trades": OPEN_TRADES,
+        "cooldown": SYMBOL_COOLDOWN
+    })
+
+
+def load_state():
+    """Open trades always come back; daily counters only on the same day"""
+    global START_DAY_BALANCE, TRADES_TODAY, KILL_SWITCH, BOT_ACTIVE, DAILY_PNL
+
+    state = _read_json(STATE_FILE)
+    if not state:
+        return
+
+    for symbol, trade in state.get("open_trades", {}).items():
+        if trade.pop("pending", None):
+            RESTORED_PENDING.add(symbol)   # may still have a resting order
+        OPEN_TRADES[symbol] = trade
+    SYMBOL_COOLDOWN.update(state.get("cooldown", {}))
+    BOT_ACTIVE = state.get("bot_active", True)
+
+    if state.get("day") == _today():
+        START_DAY_BALANCE = state.get("start_day_balance")
+        TRADES_TODAY = state.get("trades_today", 0)
+        DAILY_PNL = state.get("daily_pnl", 0.0)
+        KILL_SWITCH = state.get("kill_switch", False)
+
+
+# ===============================
+# CANDLE CACHE
+# ===============================
+
+def save_kline_cache():
+    _write_json(KLINE_CACHE_FILE, [
+        [symbol, interval, klines]
+        for (symbol, interval), klines in KLINE_CACHE.items()
+    ])
+
+
+def load_kline_cache():
+    for symbol, interval, klines in _read_json(KLINE_CACHE_FILE) or []:
+        KLINE_CACHE.setdefault((symbol, interval), klines)
+
+
+# ===============================
+# INSTRUMENT METADATA
+# ===============================
+
+def load_instruments():
+    INSTRUMENTS.update(_read_json(INSTRUMENTS_FILE) or {})
+
+
+def refresh_instruments():
+    """One paged call for every linear contract"""
+    found = {}
+    cursor = ""
+
+    try:
+        while True:
+            r = session.get_instruments_info(category="linear", limit=1000, cursor=cursor)
+            for i in r["result"]["list"]:
+                found[i["symbol"]] = {
+                    "qty_step": float(i["lotSizeFilter"]["qtyStep"]),
+                    "min_qty": float(i["lotSizeFilter"]["minOrderQty"]),
+                    "tick": float(i["priceFilter"]["tickSize"])
+                }
+            cursor = r["result"].get("nextPageCursor")
+            if not cursor:
+                break
+    except:
+        return
+
+    INSTRUMENTS.update(found)
+    _write_json(INSTRUMENTS_FILE, INSTRUMENTS)
+
+
+def round_qty(symbol, qty):
+    """Floors qty to the contract step; None when under the minimum"""
+    info = INSTRUMENTS.get(symbol)
+    if info is None:
+        return round(qty, 3)
+
+    # Decimal keeps steps like 0.25 or 0.001 exact; the tolerance keeps
+    # float remainders (0.87 - 1e-16) from losing a whole step
+    step = Decimal(str(info["qty_step"]))
+    steps = (Decimal(str(qty)) / step + QTY_TOLERANCE).to_integral_value(rounding=ROUND_FLOOR)
+    qty = float(steps * step)
+
+    if qty < info["min_qty"]:
+        return None
+    return qty
+
+
+# ===============================
+# STARTUP SEQUENCE
+# ===============================
+
+def cancel_stale_orders():
+    """
+    Cancel resting entry orders left by entries that were still executing
+    when the old process died, so they cannot fill behind the bot's back.
+    sync_positions then keeps or drops the trade from the position.
+    """
+    for symbol in list(RESTORED_PENDING):
+        for attempt in range(CONNECT_RETRIES):
+            try:
+                session.cancel_all_orders(category="linear", symbol=symbol, orderFilter="Order")
+                RESTORED_PENDING.discard(symbol)
+                break
+            except Exception as e:
+                error = e
+                time.sleep(CONNECT_BACKOFF)
+        else:
+            tg(f"⚠️ Could not cancel resting orders for {symbol}\n{error}")
+
+
+def preload_state():
+    """Local disk only: state, candles and instruments in parallel"""
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        jobs = [
+            pool.submit(load_state),
+            pool.submit(load_kline_cache),
+            pool.submit(load_instruments)
+        ]
+        for job in jobs:
+            try:
+                job.result()
+            except Exception as e:
+                print(f"Preload failed: {e}")
+
+    print(
+        f"♻️ Warm state in {round(time.time() - started, 3)}s – "
+        f"{len(OPEN_TRADES)} open trades, "
+        f"{len(KLINE_CACHE)} candle sets, "
+        f"{len(INSTRUMENTS)} instruments"
+    )
+
+
+def connect_exchange():
+    """Background: connect (with retries), then release the scan loop"""
+    while True:
+        try:
+            get_session()
+            break
+        except Exception as e:
+            print(f"Bybit still unreachable: {e}")
+            time.sleep(CONNECT_BACKOFF)
+
+    # daily state belongs to the coordinator when sharded
+    if SHARD_CLIENT is None:
+        if START_DAY_BALANCE is None:
+            init_day()
+        else:
+            tg(
+                f"♻️ BYBIT BOT RESTARTED ({MODE})\n"
+                f"Trades today: {TRADES_TODAY}\n"
+                f"Open trades: {len(OPEN_TRADES)}"
+            )
+
+    if COORDINATOR is None:   # workers own the orders when sharded
+        cancel_stale_orders()
+    EXCHANGE_READY.set()
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        pool.submit(refresh_instruments)
+        if COORDINATOR is None:   # the coordinator does not trade
+            pool.submit(start_orderbook_stream, TRADE_SYMBOLS)
+
+# ======================================================
+# PART 13 – SHARDED SCANNING (MULTI-PROCESS / MULTI-NODE)
+# ======================================================
+
+# ===============================
+# SHARD SETTINGS
+# ===============================
+#
+# `python bybit_bot.py shard --workers N` runs a coordinator (telegram,
+# web UI, daily risk) plus N local worker processes. Each worker owns
+# the symbols the hash ring gives it and runs its own scan + trailing
+# loop. Trade slots, the kill switch and daily PnL stay global in the
+# coordinator. Extra nodes join with
+# `python bybit_bot.py worker --shard K --shards N --coordinator host:port`.
+#
+# WARNING: coordinator and workers talk pickle. Anyone who can reach the
+# port and knows SHARD_AUTHKEY can run code in every process (and trade
+# with its keys). A TCP coordinator therefore refuses to start without an
+# explicit SHARD_AUTHKEY; the built-in key is only used on the default
+# unix socket, which is created 0600. Keep TCP ports on a private network.
+#
+# On a restart with a different shard count, each worker hands the
+# restored trades it no longer owns to the coordinator, and their new
+# owner adopts them on its next heartbeat. No shard opens trades until
+# every shard has checked in.
+
+SHARD_AUTHKEY = os.getenv("SHARD_AUTHKEY")
+SHARD_LOCAL_AUTHKEY = b"bybit-bot"   # unix socket only
+SHARD_VNODES = 64          # virtual nodes per shard on the hash ring
+SHARD_STALE_SECONDS = 60   # shard dropped from status after this silence
+
+SHARD_ID = None
+SHARD_CLIENT = None        # worker: proxy to the coordinator
+COORDINATOR = None         # coordinator: the shared state object
+SHARD_STATUS = {}          # coordinator: shard -> last heartbeat
+
+
+# ===============================
+# CONSISTENT HASHING
+# ===============================
+
+def _ring_hash(key):
+    return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+
+
+def build_ring(shard_count):
+    return sorted(
+        (_ring_hash(f"shard-{shard}#{v}"), shard)
+        for shard in range(shard_count)
+        for v in range(SHARD_VNODES)
+    )
+
+
+def shard_of(symbol, shard_count, ring=None):
+    ring = ring or build_ring(shard_count)
+    # (hash, shard_count) sorts after every (hash, shard) point
+    i = bisect.bisect(ring, (_ring_hash(symbol), shard_count)) % len(ring)
+    return ring[i][1]
+
+
+def shard_symbols(symbols, shard_id, shard_count):
+    """Symbols owned by one shard; adding a shard only moves ~1/N of them"""
+    ring = build_ring(shard_count)
+    return [s for s in symbols if shard_of(s, shard_count, ring) == shard_id]
+
+
+def shard_authkey(address):
+    """Explicit SHARD_AUTHKEY, else the built-in key on a unix socket only"""
+    if SHARD_AUTHKEY:
+        return SHARD_AUTHKEY.encode()
+    if isinstance(address, str):
+        return SHARD_LOCAL_AUTHKEY
+    raise SystemExit(
+        "SHARD_AUTHKEY must be set to a long random secret for a TCP "
+        "coordinator (host:port): the shard protocol is pickle"
+    )
+
+
+# ===============================
+# COORDINATOR STATE
+# ===============================
+
+class ShardCoordinator:
+    """Global bot state, served to workers from the coordinator process"""
+
+    def __init__(self, shard_count):
+        self.lock = threading.Lock()
+        self.shard_count = shard_count
+        self.checked_in = set()
+        self.handoff = {}   # symbol -> trade waiting for its new owner
+
+    def check_in(self, shard, shard_count, trades):
+        """A starting worker hands over the restored trades it does not own"""
+        if shard_count != self.shard_count:
+            raise ValueError(
+                f"worker runs {shard_count} shards, coordinator {self.shard_count}"
+            )
+
+        with self.lock:
+            self.handoff.update(trades)
+            self.checked_in.add(shard)
+
+            if len(self.checked_in) == self.shard_count:
+                print(f"🧩 All {self.shard_count} shards checked in")
+
+    def hand_off(self, trades):
+        with self.lock:
+            self.handoff.update(trades)
+
+    def adopt(self, shard):
+        ring = build_ring(self.shard_count)
+        with self.lock:
+            mine = {
+                symbol: trade for symbol, trade in self.handoff.items()
+                if shard_of(symbol, self.shard_count, ring) == shard
+            }
+            for symbol in mine:
+                del self.handoff[symbol]
+        return mine
+
+    def reserve_trade(self, shard, symbol):
+        global TRADES_TODAY
+
+        with self.lock:
+            # a restored trade on this symbol may still be on its way
+            if len(self.checked_in) < self.shard_count or symbol in self.handoff:
+                return False
+            for other, info in live_shards().items():
+                if other != shard and symbol in info["open_trades"]:
+                    return False
+
+            if KILL_SWITCH or not BOT_ACTIVE or TRADES_TODAY >= MAX_TRADES_PER_DAY:
+                return False
+            TRADES_TODAY += 1
+            return True
+
+    def release_trade(self):
+        global TRADES_TODAY
+
+        with self.lock:
+            TRADES_TODAY = max(0, TRADES_TODAY - 1)
+
+    def report_pnl(self, pnl):
+        global DAILY_PNL
+
+        with self.lock:
+            DAILY_PNL += pnl
+
+    def heartbeat(self, shard, info):
+        info["time"] = time.time()
+        SHARD_STATUS[shard] = info
+        return {**self.status(), "adopt": self.adopt(shard)}
+
+    def status(self):
+        return {
+            "bot_active": BOT_ACTIVE,
+            "kill_switch": KILL_SWITCH,
+            "trades_today": TRADES_TODAY,
+            "daily_pnl": DAILY_PNL
+        }
+
+
+class ShardManager(BaseManager):
+    pass
+
+
+ShardManager.register("coordinator", callable=lambda: COORDINATOR)
+
+
+def parse_address(address):
+    """host:port -> TCP, anything else -> unix socket path (local IPC)"""
+    if ":" in address:
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return address
+
+
+def live_shards():
+    now = time.time()
+    return {
+        shard: info for shard, info in SHARD_STATUS.items()
+        if now - info["time"] < SHARD_STALE_SECONDS
+    }
+
+
+# ===============================
+# WORKER SIDE
+# ===============================
+
+def connect_coordinator(address):
+    while True:
+        try:
+            address = parse_address(address)
+            manager = ShardManager(address=address, authkey=shard_authkey(address))
+            manager.connect()
+            return manager.coordinator()
+        except SystemExit:
+            raise
+        except Exception as e:
+            print(f"Coordinator {address} unreachable: {e}")
+            time.sleep(1)
+
+
+def sync_shard_state():
+    """
+    Pushes this worker's state view (what the coordinator's /trades,
+    /scan and /latency show) and pulls the global switches / counters
+    """
+    global BOT_ACTIVE, KILL_SWITCH, TRADES_TODAY, DAILY_PNL
+
+    try:
+        state = SHARD_CLIENT.heartbeat(SHARD_ID, state_view())
+    except Exception as e:
+        print(f"Shard {SHARD_ID} heartbeat failed: {e}")
+        return
+
+    BOT_ACTIVE = state["bot_active"]
+    KILL_SWITCH = state["kill_switch"]
+    TRADES_TODAY = state["trades_today"]
+    DAILY_PNL = state["daily_pnl"]
+
+    if state["adopt"]:
+        OPEN_TRADES.update(state["adopt"])
+        save_state()
+        tg(f"🧩 Shard {SHARD_ID} adopted: {', '.join(state['adopt'])}")
+
+
+def hand_off_trades(shard_count):
+    """Restored trades another shard owns now (shard count changed)"""
+    ring = build_ring(shard_count)
+    moving = {
+        symbol: OPEN_TRADES.pop(symbol) for symbol in list(OPEN_TRADES)
+        if shard_of(symbol, shard_count, ring) != SHARD_ID
+    }
+
+    SHARD_CLIENT.check_in(SHARD_ID, shard_count, moving)
+
+    if moving:
+        save_state()
+        print(f"🧩 Shard {SHARD_ID} handed off: {', '.join(moving)}")
+
+
+def run_shard_worker(shard_id, shard_count, address):
+    global SHARD_ID, SHARD_CLIENT, TRADE_SYMBOLS
+    global JOURNAL_DIR, STATE_FILE, KLINE_CACHE_FILE
+
+    SHARD_ID = shard_id
+    SHARD_CLIENT = connect_coordinator(address)
+    TRADE_SYMBOLS = shard_symbols(TRADE_SYMBOLS, shard_id, shard_count)
+
+    # journal segments and state files are single-writer
+    JOURNAL_DIR = os.path.join(JOURNAL_DIR, f"shard-{shard_id}")
+    STATE_FILE = os.path.join(STATE_DIR, f"bot_state.shard-{shard_id}.json")
+    KLINE_CACHE_FILE = os.path.join(STATE_DIR, f"klines.shard-{shard_id}.json")
+
+    print(f"🧩 Shard {shard_id}/{shard_count}: {', '.join(TRADE_SYMBOLS) or 'no symbols'}")
+
+    preload_state()
+    hand_off_trades(shard_count)
+    sync_shard_state()
+    start_journal()
+
+    for target in (connect_exchange, scan_markets):
+        threading.Thread(target=target, daemon=True).start()
+
+    manage_trailing()
+
+
+# ===============================
+# COORDINATOR SIDE
+# ===============================
+
+def coordinator_loop():
+    EXCHANGE_READY.wait()
+
+    while True:
+        if BOT_ACTIVE and not KILL_SWITCH:
+            daily_risk_check()
+        save_state()
+        time.sleep(SCAN_INTERVAL)
+
+
+def retire_shard_files(shard_count):
+    """
+    Trades in state files of shards that no longer exist, and the ones
+    restored from an unsharded run, go to the handoff queue
+    """
+    moving = dict(OPEN_TRADES)
+    OPEN_TRADES.clear()
+
+    try:
+        names = os.listdir(STATE_DIR)
+    except FileNotFoundError:
+        names = []
+
+    for name in names:
+        parts = name.split(".")
+        if len(parts) != 3 or not parts[1].startswith("shard-") or parts[2] != "json":
+            continue
+        if parts[0] != "bot_state" or not parts[1][6:].isdigit():
+            continue
+        if int(parts[1][6:]) < shard_count:
+            continue
+
+        path = os.path.join(STATE_DIR, name)
+        moving.update((_read_json(path) or {}).get("open_trades", {}))
+        os.replace(path, path + ".retired")
+
+    if moving:
+        COORDINATOR.hand_off(moving)
+        save_state()
+        print(f"🧩 Handing off: {', '.join(moving)}")
+
+
+def run_coordinator(workers, bind, shards=None):
+    global COORDINATOR
+
+    shards = shards or workers
+    address = parse_address(bind)
+    authkey = shard_authkey(address)
+
+    if isinstance(address, str):
+        os.makedirs(os.path.dirname(address) or ".", exist_ok=True)
+        if os.path.exists(address):
+            os.remove(address)   # stale socket from a previous run
+
+    COORDINATOR = ShardCoordinator(shards)
+    preload_state()
+    retire_shard_files(shards)
+
+    umask = os.umask(0o077)   # unix socket: owner only
+    try:
+        server = ShardManager(address=address, authkey=authkey).get_server()
+    finally:
+        os.umask(umask)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # local workers reach a wildcard bind over loopback
+    local = bind.replace("0.0.0.0:", "127.0.0.1:")
+    ctx = multiprocessing.get_context("spawn")
+    for n in range(workers):
+        ctx.Process(target=run_shard_worker, args=(n, shards, local), daemon=True).start()
+
+    tg(f"🧩 Coordinator up: {workers}/{shards} shards local on {bind}")
+
+    start_journal()
+
+    for target in (start_telegram, connect_exchange, coordinator_loop):
+        threading.Thread(target=target, daemon=True).start()
+
+    start_web()
+
+
+def shard_cli(mode, argv):
+    parser = argparse.ArgumentParser(prog=f"bybit_bot.py {mode}")
+
+    if mode == "shard":
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="local worker processes (shards 0..workers-1)")
+        parser.add_argument("--shards", type=int, default=None,
+                            help="total shards incl. remote nodes (default: --workers)")
+        parser.add_argument("--bind", default=os.path.join(STATE_DIR, "coordinator.sock"),
+                            help="unix socket path, or host:port for remote nodes. "
+                                 "TCP requires SHARD_AUTHKEY: the protocol is pickle, "
+                                 "anyone with the key can run code here")
+        args = parser.parse_args(argv)
+        run_coordinator(args.workers, args.bind, args.shards)
+    else:
+        parser.add_argument("--shard", type=int, required=True)
+        parser.add_argument("--shards", type=int, required=True)
+        parser.add_argument("--coordinator", default=os.getenv("SHARD_COORDINATOR"),
+                            required=not os.getenv("SHARD_COORDINATOR"),
+                            help="coordinator host:port or unix socket path "
+                                 "(host:port requires SHARD_AUTHKEY)")
+        args = parser.parse_args(argv)
+        run_shard_worker(args.shard, args.shards, args.coordinator)
+
+# ======================================================
+# PART 14 – HISTORY DOWNLOADER & KLINE STORE
+# ======================================================
+
+# ===============================
+# HISTORY SETTINGS
+# ===============================
+#
+# history/<interval>/<symbol>.bin holds fixed-width float64 rows
+# (start_ms, open, high, low, close, volume), ascending and unique.
+# 48 bytes per bar, no header: the file IS the array, so
+# load_history() is a single mmap with no parsing. Backfills
+# checkpoint into <symbol>.bin.part (appended, unordered) and
+# are folded into the store once per range.
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", "history")
+HISTORY_PAGE = 1000          # Bybit max bars per get_kline call
+HISTORY_RATE = float(os.getenv("HISTORY_RATE", "50"))   # requests / second, all threads
+HISTORY_WORKERS = 16
+HISTORY_FLUSH_PAGES = 25     # checkpoint to the side file every N pages
+
+HISTORY_FIELDS = ["start", "open", "high", "low", "close", "volume"]
+HISTORY_WIDTH = len(HISTORY_FIELDS)
+
+INTERVAL_MS = {
+    "1": 60000, "3": 180000, "5": 300000, "15": 900000, "30": 1800000,
+    "60": 3600000, "120": 7200000, "240": 14400000, "360": 21600000,
+    "720": 43200000, "D": 86400000, "W": 604800000
+}
+
+HISTORY_RATE_LOCK = threading.Lock()
+HISTORY_NEXT_CALL = 0.0
+
+
+# ===============================
+# STORE (MEMORY-MAPPED)
+# ===============================
+
+def history_path(symbol, interval):
+    return os.path.join(HISTORY_DIR, interval, symbol + ".bin")
+
+
+def load_history(symbol, interval):
+    """
+    Returns a read-only float64 memoryview of the stored rows
+    (row i = view[i * 6:(i + 1) * 6]), or None
+    """
+    try:
+        with open(history_path(symbol, interval), "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    raw = memoryview(mm)
+    row_bytes = HISTORY_WIDTH * 8
+    return raw[:len(raw) - len(raw) % row_bytes].cast("d")
+
+
+def history_column(view, field):
+    """Strided zero-copy view of one field, e.g. history_column(v, "close")"""
+    return view[HISTORY_FIELDS.index(field)::HISTORY_WIDTH]
+
+
+def history_span(symbol, interval):
+    view = load_history(symbol, interval)
+    if not view:
+        return None, None
+    return int(view[0]), int(view[-HISTORY_WIDTH])
+
+
+def _history_merge(symbol, interval, rows):
+    """
+    rows: {start_ms: (o, h, l, c, v)}. Extends the stored range on
+    either side; overlaps are dropped except the newest stored bar,
+    which may have been saved while still open.
+    """
+    path = history_path(symbol, interval)
+    old = array("d")
+    try:
+        with open(path, "rb") as f:
+            old.frombytes(f.read())
+    except FileNotFoundError:
+        pass
+
+    del old[len(old) - len(old) % HISTORY_WIDTH:]
+    n = len(old) // HISTORY_WIDTH
+    first = old[0] if n else None
+    last = old[-HISTORY_WIDTH] if n else None
+
+    out = array("d")
+    for ts in sorted(ts for ts in rows if first is None or ts < first):
+        out.append(ts)
+        out.extend(rows[ts])
+
+    if n:
+        out.extend(old[:-HISTORY_WIDTH] if last in rows else old)
+        for ts in sorted(ts for ts in rows if ts >= last):
+            out.append(ts)
+            out.extend(rows[ts])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        out.tofile(f)
+    os.replace(tmp, path)   # open mmaps keep the old file
+
+
+def _history_part_path(symbol, interval):
+    return history_path(symbol, interval) + ".part"
+
+
+def _history_append_part(symbol, interval, rows):
+    """Checkpoint: append rows to the side file, no rewrite of the store"""
+    out = array("d")
+    for ts in sorted(rows):
+        out.append(ts)
+        out.extend(rows[ts])
+
+    path = _history_part_path(symbol, interval)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        f.truncate(f.tell() - f.tell() % (HISTORY_WIDTH * 8))   # torn last row
+        out.tofile(f)
+
+
+def _history_merge_part(symbol, interval):
+    """Folds the side file into the store (one rewrite); returns its bar count"""
+    path = _history_part_path(symbol, interval)
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+    except FileNotFoundError:
+        return 0
+
+    part = array("d")
+    part.frombytes(raw[:len(raw) - len(raw) % (HISTORY_WIDTH * 8)])
+    rows = {
+        int(part[i]): tuple(part[i + 1:i + HISTORY_WIDTH])
+        for i in range(0, len(part), HISTORY_WIDTH)
+    }
+
+    if rows:
+        _history_merge(symbol, interval, rows)
+    os.remove(path)
+    return len(rows)
+
+
+# ===============================
+# PAGED DOWNLOAD
+# ===============================
+
+def _history_rate_wait():
+    global HISTORY_NEXT_CALL
+
+    with HISTORY_RATE_LOCK:
+        now = time.time()
+        wait = HISTORY_NEXT_CALL - now
+        HISTORY_NEXT_CALL = max(now, HISTORY_NEXT_CALL) + 1 / HISTORY_RATE
+
+    if wait > 0:
+        time.sleep(wait)
+
+
+def _history_page(symbol, interval, start_ms, end_ms):
+    for attempt in range(5):
+        _history_rate_wait()
+        try:
+            r = session.get_kline(
+                category="linear",
+                symbol=symbol,
+                interval=interval,
+                start=start_ms,
+                end=end_ms,
+                limit=HISTORY_PAGE
+            )
+            return r["result"]["list"]
+        except Exception as e:
+            print(f"History {symbol} {interval} retry {attempt + 1}: {e}")
+            time.sleep(2 ** attempt)
+    raise ConnectionError(f"History page failed: {symbol} {interval}")
+
+
+def _history_fetch_range(symbol, interval, start_ms, end_ms, checkpoint):
+    """
+    Pages backwards from end_ms to start_ms and merges once at the end.
+    With checkpoint, every HISTORY_FLUSH_PAGES pages also go to the side
+    file, so an interrupted run resumes from the oldest bar fetched.
+    """
+    rows = {}
+    pages = 0
+    total = 0
+    cursor = end_ms
+
+    while cursor >= start_ms:
+        page = _history_page(symbol, interval, start_ms, cursor)
+        if not page:
+            break
+
+        for k in page:
+            rows[int(k[0])] = tuple(float(x) for x in k[1:HISTORY_WIDTH])
+
+        oldest = min(int(k[0]) for k in page)
+        cursor = oldest - 1
+        pages += 1
+
+        if checkpoint and pages % HISTORY_FLUSH_PAGES == 0:
+            _history_append_part(symbol, interval, rows)
+            total += len(rows)
+            rows = {}
+
+        if len(page) < HISTORY_PAGE:
+            break
+
+    total += len(rows)
+    if checkpoint:
+        if rows:
+            _history_append_part(symbol, interval, rows)
+        _history_merge_part(symbol, interval)
+    elif rows:
+        _history_merge(symbol, interval, rows)
+    return total
+
+
+def download_history(symbol, interval, start_ms, end_ms=None):
+    """Fills [start_ms, end_ms] around whatever is already stored"""
+    end_ms = end_ms or int(time.time() * 1000)
+    _history_merge_part(symbol, interval)   # resume an interrupted backfill
+    first, last = history_span(symbol, interval)
+    fetched = 0
+
+    if first is None:
+        fetched += _history_fetch_range(symbol, interval, start_ms, end_ms, True)
+    else:
+        if last < end_ms:
+            # from the newest stored bar: it may have been saved while open
+            fetched += _history_fetch_range(symbol, interval, last, end_ms, False)
+        if start_ms < first:
+            fetched += _history_fetch_range(symbol, interval, start_ms, first - 1, True)
+
+    return fetched
+
+
+def download_many(symbols, intervals, days):
+    start_ms = int((time.time() - days * 86400) * 1000)
+    jobs = [(s, i) for s in symbols for i in intervals]
+    started = time.time()
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=HISTORY_WORKERS) as pool:
+        futures = {
+            pool.submit(download_history, s, i, start_ms): (s, i)
+            for s, i in jobs
+        }
+        for future in as_completed(futures):
+            symbol, interval = futures[future]
+            done += 1
+            try:
+                bars = future.result()
+                print(f"[{done}/{len(jobs)}] {symbol} {interval}: +{bars} bars")
+            except Exception as e:
+                print(f"[{done}/{len(jobs)}] {symbol} {interval} FAILED: {e}")
+
+    print(f"History done in {round(time.time() - started, 1)}s")
+
+
+# ===============================
+# CLI
+# ===============================
+
+def history_cli(argv):
+    global HISTORY_RATE
+
+    parser = argparse.ArgumentParser(prog="bybit_bot.py history")
+    parser.add_argument("--symbols", nargs="+", default=SYMBOLS)
+    parser.add_argument("--intervals", nargs="+", default=[BASE_TIMEFRAME],
+                        choices=sorted(INTERVAL_MS))
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--rate", type=float, default=HISTORY_RATE,
+                        help="max get_kline requests per second")
+    args = parser.parse_args(argv)
+
+    HISTORY_RATE = args.rate
+    download_many(args.symbols, args.intervals, args.days)
+
+# ======================================================
+# PART 15 – THREADS & MAIN RUNNER
+# ======================================================
+
+if __name__ == "__main__":
+    # ---- CLI: JOURNAL REPORTS ----
+    if len(sys.argv) > 1 and sys.argv[1] == "journal":
+        journal_cli(sys.argv[2:])
+        sys.exit(0)
+
+    # ---- CLI: HISTORY DOWNLOAD ----
+    if len(sys.argv) > 1 and sys.argv[1] == "history":
+        history_cli(sys.argv[2:])
+        sys.exit(0)
+
+    # ---- CLI: SHARDED MODE (COORDINATOR / REMOTE WORKER) ----
+    if len(sys.argv) > 1 and sys.argv[1] in ("shard", "worker"):
+        shard_cli(sys.argv[1], sys.argv[2:])
+        sys.exit(0)
+
+    # ---- WARM STATE (LOCAL, PARALLEL) ----
+    preload_state()
+
+    # ---- JOURNAL WRITER THREAD (+ FLUSH ON EXIT / SIGTERM) ----
+    start_journal()
+
+    # ---- TELEGRAM THREAD ----
+    threading.Thread(
+        target=start_telegram,
+        daemon=True
+    ).start()
+
+    # ---- EXCHANGE CONNECT + INIT DAY (LAZY) ----
+    threading.Thread(
+        target=connect_exchange,
         daemon=True
     ).start()
 
-    # ---- MARKET SCAN THREAD ----
+    # ---- MARKET SCAN THREAD (WAITS FOR EXCHANGE) ----
     threading.Thread(
         target=scan_markets,
         daemon=True
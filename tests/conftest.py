@@ -0,0 +1,21 @@
+import os
+import sys
+from array import array
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bybit_bot as bot
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """Empty journal in tmp_path, nothing buffered"""
+    monkeypatch.setattr(bot, "JOURNAL_DIR", str(tmp_path))
+    monkeypatch.setattr(bot, "JOURNAL_NAMES", {})
+    monkeypatch.setattr(bot, "JOURNAL_DAY", None)
+    monkeypatch.setattr(bot, "JOURNAL_BUFFER", {
+        name: array(code) for name, code in bot.JOURNAL_COLUMNS.items()
+    })
+    return tmp_path
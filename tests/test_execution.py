@@ -0,0 +1,182 @@
+import pytest
+
+import bybit_bot as bot
+
+
+class Clock:
+    """Stands in for the time module: sleep() only moves the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds or 0.01
+
+
+class FakeExchange:
+    """
+    Orders are kept in a list; their id is the index. Market orders fill
+    at `market_price`; limit order state comes from `limit_state(n, checks)`
+    (n = order index, checks = status lookups so far), None = lookup fails.
+    """
+
+    def __init__(self, limit_state, market_price=100.0):
+        self.limit_state = limit_state
+        self.market_price = market_price
+        self.orders, self.amends, self.cancels = [], [], []
+        self.checks = {}
+
+    def place_order(self, **kw):
+        self.orders.append(kw)
+        return {"result": {"orderId": str(len(self.orders) - 1)}}
+
+    def amend_order(self, **kw):
+        self.amends.append(kw)
+
+    def cancel_order(self, **kw):
+        self.cancels.append(kw)
+
+    def get_open_orders(self, category, symbol, orderId):
+        n = int(orderId)
+        if self.orders[n]["orderType"] == "Market":
+            state = ("Filled", self.orders[n]["qty"], self.market_price)
+        else:
+            self.checks[n] = self.checks.get(n, 0) + 1
+            state = self.limit_state(n, self.checks[n])
+        if state is None:
+            raise ConnectionError("status lookup failed")
+
+        status, filled, avg = state
+        return {"result": {"list": [
+            {"orderStatus": status, "cumExecQty": str(filled), "avgPrice": str(avg)}
+        ]}}
+
+    def types(self):
+        return [o["orderType"] for o in self.orders]
+
+
+@pytest.fixture
+def exchange(monkeypatch):
+    monkeypatch.setattr(bot, "time", Clock())
+    monkeypatch.setattr(bot, "INSTRUMENTS", {
+        "ETHUSDT": {"qty_step": 0.01, "min_qty": 0.01, "tick": 0.01},
+        "XRPUSDT": {"qty_step": 1.0, "min_qty": 1.0, "tick": 0.0001}
+    })
+
+    def install(limit_state, tops, market_price=100.0):
+        fake = FakeExchange(limit_state, market_price)
+        monkeypatch.setattr(bot, "session", fake)
+        quotes = iter(tops)
+        last = [tops[0]]
+
+        def top(symbol):
+            last[0] = next(quotes, last[0])
+            return last[0]
+
+        monkeypatch.setattr(bot, "get_top_of_book", top)
+        return fake
+
+    return install
+
+
+def chase(qty=1.0, side="Buy"):
+    return bot.chase_entry("ETHUSDT", side, qty, 100.0, 110.0, 95.0)
+
+
+# ===============================
+# CHASE
+# ===============================
+
+def test_chase_reprices_with_the_book(exchange):
+    fake = exchange(
+        lambda n, checks: ("New", 0, 0) if checks < 2 else ("Filled", 1.0, 100.05),
+        tops=[(100.0, 100.1), (100.05, 100.15)]
+    )
+
+    assert chase() == (100.05, 1.0, 1.0)
+    assert fake.types() == ["Limit"]
+    assert fake.amends[0]["price"] == "100.05"
+    assert not fake.cancels
+
+
+def test_post_only_reject_is_reposted(exchange):
+    fake = exchange(
+        lambda n, checks: ("Cancelled", 0, 0) if n == 0 else ("Filled", 1.0, 100.0),
+        tops=[(100.0, 100.1)]
+    )
+
+    assert chase() == (100.0, 1.0, 1.0)
+    assert fake.types() == ["Limit", "Limit"]
+
+
+def test_timeout_sends_the_rest_to_market(exchange):
+    fake = exchange(
+        lambda n, checks: ("PartiallyFilled", 0.4, 100.0) if checks < 50 else ("Cancelled", 0.4, 100.0),
+        tops=[(100.0, 100.1)],
+        market_price=100.1
+    )
+
+    avg, filled, maker = chase()
+
+    assert fake.types() == ["Limit", "Market"]
+    assert fake.orders[1]["qty"] == 0.6
+    assert (filled, maker) == (1.0, 0.4)
+    assert avg == pytest.approx(100.06)
+
+
+def test_unknown_state_after_cancel_sends_no_market(exchange):
+    fake = exchange(
+        lambda n, checks: ("New", 0, 0) if checks < 20 else None,
+        tops=[(100.0, 100.1)]
+    )
+
+    assert chase() == (None, None, 0.0)
+    assert fake.types() == ["Limit"]
+    assert len(fake.cancels) == 1
+
+
+def test_move_in_favour_keeps_chasing(exchange):
+    # LONG signal at 100, bid drops 30 bps: cheaper, keep the maker order
+    fake = exchange(
+        lambda n, checks: ("New", 0, 0) if checks < 3 else ("Filled", 1.0, 99.7),
+        tops=[(100.0, 100.1), (99.7, 99.8)]
+    )
+
+    assert chase() == (99.7, 1.0, 1.0)
+    assert fake.types() == ["Limit"]
+    assert not fake.cancels
+
+
+def test_move_against_takes_market(exchange):
+    fake = exchange(
+        lambda n, checks: ("New", 0, 0) if checks < 2 else ("Cancelled", 0, 0),
+        tops=[(100.0, 100.1), (100.3, 100.4)],
+        market_price=100.4
+    )
+
+    assert chase() == (100.4, 1.0, 0.0)
+    assert fake.types() == ["Limit", "Market"]
+
+
+# ===============================
+# TWAP
+# ===============================
+
+def test_twap_slices_follow_the_qty_step(exchange):
+    assert bot.twap_slices("ETHUSDT", 1.37) == [0.27, 0.27, 0.27, 0.27, 0.29]
+    assert bot.twap_slices("XRPUSDT", 8003) == [1600.0] * 4 + [1603.0]
+    assert bot.twap_slices("XRPUSDT", 4) == [4]   # slice under min_qty: one order
+
+
+def test_twap_market_slices_are_step_aligned(exchange, monkeypatch):
+    monkeypatch.setattr(bot, "EXEC_MODE", "MARKET")
+    fake = exchange(lambda n, checks: None, tops=[(100.0, 100.1)])
+
+    avg, filled, maker = bot.twap_entry("ETHUSDT", "Buy", 1.37, 100.0, 110.0, 95.0)
+
+    assert [o["qty"] for o in fake.orders] == [0.27, 0.27, 0.27, 0.27, 0.29]
+    assert filled == pytest.approx(1.37)
+    assert avg == pytest.approx(100.0) and maker == 0.0
@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import bybit_bot as bot
+
+M = 60000
+
+
+def bars(*starts):
+    return {t * M: (1.0, 2.0, 0.5, float(t), 9.0) for t in starts}
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "HISTORY_DIR", str(tmp_path))
+    return tmp_path
+
+
+def stored_starts():
+    view = bot.load_history("BTCUSDT", "1")
+    return [int(t) // M for t in bot.history_column(view, "start")]
+
+
+def test_history_merge_extends_both_sides(history):
+    bot._history_merge("BTCUSDT", "1", bars(5, 6, 7))
+    bot._history_merge("BTCUSDT", "1", bars(2, 3, 4))
+    bot._history_merge("BTCUSDT", "1", bars(8, 9))
+
+    assert stored_starts() == list(range(2, 10))
+
+
+def test_history_merge_replaces_newest_bar(history):
+    bot._history_merge("BTCUSDT", "1", bars(1, 2, 3))
+    bot._history_merge("BTCUSDT", "1", {3 * M: (1.0, 2.0, 0.5, 42.0, 9.0), 4 * M: (1.0, 2.0, 0.5, 4.0, 9.0)})
+
+    view = bot.load_history("BTCUSDT", "1")
+    assert stored_starts() == [1, 2, 3, 4]
+    assert list(bot.history_column(view, "close")) == [1.0, 2.0, 42.0, 4.0]
+
+
+def test_history_side_file_merges_once(history):
+    bot._history_merge("BTCUSDT", "1", bars(10, 11))
+    bot._history_append_part("BTCUSDT", "1", bars(7, 8, 9))
+    bot._history_append_part("BTCUSDT", "1", bars(4, 5, 6))
+
+    assert stored_starts() == [10, 11]
+    assert bot._history_merge_part("BTCUSDT", "1") == 6
+    assert stored_starts() == list(range(4, 12))
+    assert not os.path.exists(bot._history_part_path("BTCUSDT", "1"))
+
+
+# ===============================
+# RESUMABLE DOWNLOAD
+# ===============================
+
+class Crash(BaseException):
+    """Process killed mid-download (not retried like a page error)"""
+
+
+class KlinePages:
+    """get_kline over 1m bars 0..bars-1; raises Crash on call number `crash_at`"""
+
+    def __init__(self, bars, crash_at=None):
+        self.bars = bars
+        self.crash_at = crash_at
+        self.calls = 0
+
+    def get_kline(self, category, symbol, interval, start, end, limit):
+        self.calls += 1
+        if self.calls == self.crash_at:
+            raise Crash()
+        starts = [t for t in range(self.bars) if start <= t * M <= end][-limit:]
+        return {"result": {"list": [
+            [str(t * M), "1", "2", "0.5", str(t), "9"] for t in reversed(starts)
+        ]}}
+
+
+def test_interrupted_backfill_resumes_from_side_file(history, monkeypatch):
+    monkeypatch.setattr(bot, "HISTORY_RATE", 1e9)
+    monkeypatch.setattr(bot, "HISTORY_PAGE", 10)
+    monkeypatch.setattr(bot, "HISTORY_FLUSH_PAGES", 3)
+
+    monkeypatch.setattr(bot, "session", KlinePages(200, crash_at=8))
+    with pytest.raises(Crash):
+        bot.download_history("BTCUSDT", "1", 0, 199 * M)
+
+    # two checkpoints (6 pages) survived, the store itself is untouched
+    assert os.path.getsize(bot._history_part_path("BTCUSDT", "1")) == 60 * 48
+    assert bot.load_history("BTCUSDT", "1") is None
+
+    resumed = KlinePages(200)
+    monkeypatch.setattr(bot, "session", resumed)
+    assert bot.download_history("BTCUSDT", "1", 0, 199 * M) == 140
+
+    assert stored_starts() == list(range(200))
+    assert resumed.calls == 14           # only the 140 bars still missing
+    assert not os.path.exists(bot._history_part_path("BTCUSDT", "1"))
@@ -0,0 +1,80 @@
+import pytest
+
+import bybit_bot as bot
+
+
+def test_journal_round_trip(journal):
+    bot.journal_fill("BTCUSDT", "LONG", 100.5, 0.2, 100.0)
+    bot.journal_close("BTCUSDT", "LONG", 110.0, 0.2, 100.5, 1.9)
+    bot.journal_close("ETHUSDT", "SHORT", 90.0, 1.0, 95.0, -0.5)
+    bot.journal_flush()
+
+    closes = bot.journal_closes()
+    assert [c["symbol"] for c in closes] == ["ETHUSDT", "BTCUSDT"]
+    assert closes[1]["exit"] == 110.0 and closes[1]["pnl"] == 1.9
+
+    stats = bot.journal_win_rate()
+    assert stats["BTCUSDT"]["wins"] == 1 and stats["ETHUSDT"]["wins"] == 0
+
+    slip = bot.journal_slippage(symbol="BTCUSDT")
+    assert slip["BTCUSDT"]["avg_bps"] == pytest.approx(50.0)
+
+
+def test_day_roll_flush_error_does_not_reach_caller(journal, monkeypatch):
+    bot.journal_close("BTCUSDT", "LONG", 110.0, 0.2, 100.5, 1.9)
+    monkeypatch.setattr(bot, "JOURNAL_DAY", "2000-01-01")
+
+    def broken():
+        raise OSError("disk full")
+
+    monkeypatch.setattr(bot, "_journal_flush_locked", broken)
+    bot.journal_close("BTCUSDT", "LONG", 111.0, 0.2, 100.5, 2.1)
+
+    assert bot.JOURNAL_DAY == bot._today()
+
+
+# ===============================
+# POSITION SYNC
+# ===============================
+
+class PagedPositions:
+    """get_positions with `per_page` rows per page and a cursor"""
+
+    def __init__(self, symbols, per_page):
+        self.symbols = symbols
+        self.per_page = per_page
+        self.calls = []
+
+    def get_positions(self, **kw):
+        self.calls.append(kw)
+        start = int(kw.get("cursor") or 0)
+        page = self.symbols[start:start + self.per_page]
+        more = start + self.per_page < len(self.symbols)
+        return {"result": {
+            "list": [{"symbol": s, "size": "1", "avgPrice": "100"} for s in page],
+            "nextPageCursor": str(start + self.per_page) if more else ""
+        }}
+
+
+def test_open_positions_follow_the_cursor(monkeypatch):
+    symbols = [f"S{i}USDT" for i in range(450)]
+    fake = PagedPositions(symbols, bot.POSITION_PAGE)
+    monkeypatch.setattr(bot, "session", fake)
+
+    assert sorted(bot.get_open_positions()) == sorted(symbols)
+    assert len(fake.calls) == 3
+    assert all(c["limit"] == bot.POSITION_PAGE for c in fake.calls)
+
+
+def test_trade_past_the_first_page_stays_open(journal, monkeypatch):
+    symbols = [f"S{i}USDT" for i in range(250)]
+    monkeypatch.setattr(bot, "session", PagedPositions(symbols, bot.POSITION_PAGE))
+    monkeypatch.setattr(bot, "OPEN_TRADES", {
+        "S240USDT": {"side": "LONG", "entry": 100.0, "fill": 100.0, "qty": 1.0, "sl": 95.0}
+    })
+    monkeypatch.setattr(bot, "tg", lambda msg: None)
+
+    bot.sync_positions()
+
+    assert "S240USDT" in bot.OPEN_TRADES
+    assert not bot.journal_closes()
@@ -0,0 +1,82 @@
+import pytest
+
+import bybit_bot as bot
+
+SENT = []
+
+
+class FakeSocket:
+    class ws:
+        @staticmethod
+        def send(message):
+            SENT.append(message)
+
+
+def book_msg(u, bid=100.0, ask=101.0):
+    # pybit hands over its merged book: full levels, always "snapshot"
+    return {
+        "type": "snapshot",
+        "data": {
+            "s": "BTCUSDT",
+            "u": u,
+            "b": [[str(bid - 1), "2"], [str(bid), "1"]],
+            "a": [[str(ask + 1), "1"], [str(ask), "3"]]
+        }
+    }
+
+
+@pytest.fixture
+def books(monkeypatch):
+    SENT.clear()
+    monkeypatch.setattr(bot, "BOOKS", {})
+    monkeypatch.setattr(bot, "BOOK_WS", FakeSocket)
+    return bot.BOOKS
+
+
+def test_book_loads_sorted_levels(books):
+    bot.on_orderbook(book_msg(1))
+
+    assert bot.book_top("BTCUSDT") == (100.0, 101.0)
+    assert list(books["BTCUSDT"]["bid_px"]) == [99.0, 100.0]
+    assert list(books["BTCUSDT"]["ask_px"]) == [-102.0, -101.0]
+
+
+def test_book_gap_invalidates_and_resubscribes(books):
+    bot.on_orderbook(book_msg(1))
+    bot.on_orderbook(book_msg(2, bid=100.5))
+    assert bot.book_top("BTCUSDT") == (100.5, 101.0)
+
+    bot.on_orderbook(book_msg(5))   # 3 and 4 missing
+
+    assert not books["BTCUSDT"]["valid"]
+    assert bot.book_top("BTCUSDT") == (None, None)
+    assert len(SENT) == 2 and '"unsubscribe"' in SENT[0] and '"subscribe"' in SENT[1]
+    assert "req_id" not in SENT[1]
+
+    # still the broken book until the grace period is over
+    bot.on_orderbook(book_msg(6))
+    assert not books["BTCUSDT"]["valid"]
+
+    books["BTCUSDT"]["resync_at"] = 0
+    bot.on_orderbook(book_msg(900, bid=99.5))
+    assert bot.book_top("BTCUSDT") == (99.5, 101.0)
+    assert books["BTCUSDT"]["u"] == 900
+
+
+def test_book_duplicate_and_restart(books):
+    bot.on_orderbook(book_msg(7))
+    bot.on_orderbook(book_msg(8))
+    bot.on_orderbook(book_msg(8, bid=90.0))   # duplicate: ignored
+    assert bot.book_top("BTCUSDT") == (100.0, 101.0)
+
+    bot.on_orderbook(book_msg(1, bid=95.0))   # service restart snapshot
+    assert bot.book_top("BTCUSDT") == (95.0, 101.0)
+    assert not SENT
+
+
+def test_crossed_book_is_invalidated(books):
+    bot.on_orderbook(book_msg(1))
+    bot.on_orderbook(book_msg(2, bid=102.0, ask=101.0))
+
+    assert not books["BTCUSDT"]["valid"]
+    assert len(SENT) == 2
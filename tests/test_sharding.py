@@ -0,0 +1,158 @@
+import json
+
+import pytest
+
+import bybit_bot as bot
+
+SYMBOLS = [f"S{i}USDT" for i in range(200)]
+
+
+# ===============================
+# HASH RING
+# ===============================
+
+def test_shard_symbols_partition():
+    shards = [bot.shard_symbols(SYMBOLS, k, 4) for k in range(4)]
+
+    assert sorted(s for owned in shards for s in owned) == sorted(SYMBOLS)
+    assert all(owned for owned in shards)
+    for k, owned in enumerate(shards):
+        assert all(bot.shard_of(s, 4) == k for s in owned)
+
+
+def test_adding_a_shard_only_moves_to_it():
+    before = {s: bot.shard_of(s, 4) for s in SYMBOLS}
+    after = {s: bot.shard_of(s, 5) for s in SYMBOLS}
+
+    moved = [s for s in SYMBOLS if before[s] != after[s]]
+    assert moved and all(after[s] == 4 for s in moved)
+    assert len(moved) < len(SYMBOLS) / 2
+
+
+# ===============================
+# AUTH KEY
+# ===============================
+
+def test_tcp_needs_an_explicit_authkey(monkeypatch):
+    monkeypatch.setattr(bot, "SHARD_AUTHKEY", None)
+
+    with pytest.raises(SystemExit):
+        bot.shard_authkey(("0.0.0.0", 7070))
+    assert bot.shard_authkey("/tmp/coordinator.sock") == bot.SHARD_LOCAL_AUTHKEY
+
+    monkeypatch.setattr(bot, "SHARD_AUTHKEY", "s3cret")
+    assert bot.shard_authkey(("0.0.0.0", 7070)) == b"s3cret"
+
+
+# ===============================
+# COORDINATOR OVER LOCAL IPC
+# ===============================
+
+def owned_by(shard, count=2):
+    return next(s for s in SYMBOLS if bot.shard_of(s, count) == shard)
+
+
+@pytest.fixture
+def coordinator(tmp_path, monkeypatch):
+    """A 2-shard coordinator served on a unix socket in tmp_path"""
+    monkeypatch.setattr(bot, "SHARD_AUTHKEY", None)
+    monkeypatch.setattr(bot, "SHARD_STATUS", {})
+    monkeypatch.setattr(bot, "TRADES_TODAY", 0)
+    monkeypatch.setattr(bot, "BOT_ACTIVE", True)
+    monkeypatch.setattr(bot, "KILL_SWITCH", False)
+    monkeypatch.setattr(bot, "COORDINATOR", bot.ShardCoordinator(2))
+
+    address = str(tmp_path / "coordinator.sock")
+    server = bot.ShardManager(address=address, authkey=bot.shard_authkey(address)).get_server()
+
+    def serve():
+        try:
+            server.serve_forever()
+        except SystemExit:   # serve_forever exits via sys.exit on stop
+            pass
+
+    bot.threading.Thread(target=serve, daemon=True).start()
+
+    yield address
+
+    server.stop_event.set()
+
+
+def heartbeat(client, shard, open_trades=None):
+    return client.heartbeat(shard, {"symbols": [], "open_trades": open_trades or {}})
+
+
+def test_no_trades_before_every_shard_checks_in(coordinator):
+    client = bot.connect_coordinator(coordinator)
+    symbol = owned_by(0)
+
+    client.check_in(0, 2, {})
+    assert not client.reserve_trade(0, symbol)
+
+    client.check_in(1, 2, {})
+    assert client.reserve_trade(0, symbol)
+    assert bot.TRADES_TODAY == 1
+
+
+def test_wrong_shard_count_is_rejected(coordinator):
+    client = bot.connect_coordinator(coordinator)
+
+    with pytest.raises(ValueError):
+        client.check_in(0, 3, {})
+
+
+def test_handed_off_trade_goes_to_its_owner(coordinator):
+    client = bot.connect_coordinator(coordinator)
+    symbol = owned_by(1)
+    trade = {"side": "LONG", "entry": 100.0, "qty": 1.0, "sl": 95.0}
+
+    client.check_in(0, 2, {symbol: trade})
+    client.check_in(1, 2, {})
+
+    assert not client.reserve_trade(1, symbol)          # still queued
+    assert heartbeat(client, 0)["adopt"] == {}
+    assert heartbeat(client, 1)["adopt"] == {symbol: trade}
+    assert heartbeat(client, 1)["adopt"] == {}
+
+
+def test_symbol_open_in_another_shard_is_refused(coordinator):
+    client = bot.connect_coordinator(coordinator)
+    symbol = owned_by(0)
+    client.check_in(0, 2, {})
+    client.check_in(1, 2, {})
+
+    heartbeat(client, 1, {symbol: {"side": "LONG"}})
+
+    assert not client.reserve_trade(0, symbol)
+    assert client.reserve_trade(1, symbol)
+
+
+def test_worker_hands_off_restored_trades(coordinator, tmp_path, monkeypatch):
+    mine, theirs = owned_by(0), owned_by(1)
+    monkeypatch.setattr(bot, "STATE_FILE", str(tmp_path / "bot_state.shard-0.json"))
+    monkeypatch.setattr(bot, "SHARD_ID", 0)
+    monkeypatch.setattr(bot, "SHARD_CLIENT", bot.connect_coordinator(coordinator))
+    monkeypatch.setattr(bot, "OPEN_TRADES", {mine: {"side": "LONG"}, theirs: {"side": "SHORT"}})
+
+    bot.hand_off_trades(2)
+
+    assert list(bot.OPEN_TRADES) == [mine]
+    with open(bot.STATE_FILE) as f:
+        assert list(json.load(f)["open_trades"]) == [mine]
+    assert bot.COORDINATOR.handoff == {theirs: {"side": "SHORT"}}
+
+
+def test_retired_shard_files_are_handed_off(coordinator, tmp_path, monkeypatch):
+    monkeypatch.setattr(bot, "STATE_DIR", str(tmp_path))
+    monkeypatch.setattr(bot, "STATE_FILE", str(tmp_path / "bot_state.json"))
+    monkeypatch.setattr(bot, "OPEN_TRADES", {"AUSDT": {"side": "LONG"}})
+    for shard in (1, 2):
+        path = tmp_path / f"bot_state.shard-{shard}.json"
+        path.write_text(json.dumps({"open_trades": {f"S{shard}X": {"side": "LONG"}}}))
+
+    bot.retire_shard_files(2)
+
+    assert sorted(bot.COORDINATOR.handoff) == ["AUSDT", "S2X"]
+    assert (tmp_path / "bot_state.shard-2.json.retired").exists()
+    assert (tmp_path / "bot_state.shard-1.json").exists()
+    assert not bot.OPEN_TRADES
@@ -0,0 +1,73 @@
+import json
+
+import bybit_bot as bot
+
+
+def test_round_qty_uses_exact_steps(monkeypatch):
+    monkeypatch.setattr(bot, "INSTRUMENTS", {
+        "QUARTER": {"qty_step": 0.25, "min_qty": 0.5, "tick": 0.1},
+        "MILLI": {"qty_step": 0.001, "min_qty": 0.001, "tick": 0.1},
+        "CENTI": {"qty_step": 0.01, "min_qty": 0.01, "tick": 0.1}
+    })
+
+    assert bot.round_qty("QUARTER", 1.8) == 1.75
+    assert bot.round_qty("QUARTER", 1.2) == 1.0
+    assert bot.round_qty("QUARTER", 0.3) is None
+    assert bot.round_qty("MILLI", 0.029) == 0.029
+    assert bot.round_qty("MILLI", 0.0289999) == 0.028
+    assert bot.round_qty("CENTI", 1.37 - 0.5) == 0.87   # float remainder
+    assert bot.round_qty("UNKNOWN", 1.23456) == 1.235
+
+
+# ===============================
+# RESTART WITH PENDING ENTRIES
+# ===============================
+
+class CancelSession:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.cancelled = []
+
+    def cancel_all_orders(self, **kw):
+        if self.fail:
+            raise ConnectionError("down")
+        self.cancelled.append(kw)
+
+
+def restore(tmp_path, monkeypatch, trades):
+    path = tmp_path / "bot_state.json"
+    path.write_text(json.dumps({"day": "2000-01-01", "open_trades": trades}))
+    monkeypatch.setattr(bot, "STATE_FILE", str(path))
+    monkeypatch.setattr(bot, "OPEN_TRADES", {})
+    monkeypatch.setattr(bot, "RESTORED_PENDING", set())
+    bot.load_state()
+
+
+def test_restored_pending_entries_get_cancelled(tmp_path, monkeypatch):
+    restore(tmp_path, monkeypatch, {
+        "BTCUSDT": {"side": "LONG", "entry": 100.0, "qty": 1.0, "sl": 95.0, "pending": True},
+        "ETHUSDT": {"side": "LONG", "entry": 10.0, "fill": 10.0, "qty": 1.0, "sl": 9.0}
+    })
+    fake = CancelSession()
+    monkeypatch.setattr(bot, "session", fake)
+
+    bot.cancel_stale_orders()
+
+    assert "pending" not in bot.OPEN_TRADES["BTCUSDT"]
+    assert fake.cancelled == [{"category": "linear", "symbol": "BTCUSDT", "orderFilter": "Order"}]
+    assert not bot.RESTORED_PENDING
+
+
+def test_failed_cancel_warns(tmp_path, monkeypatch):
+    restore(tmp_path, monkeypatch, {
+        "BTCUSDT": {"side": "LONG", "entry": 100.0, "qty": 1.0, "sl": 95.0, "pending": True}
+    })
+    sent = []
+    monkeypatch.setattr(bot, "session", CancelSession(fail=True))
+    monkeypatch.setattr(bot, "CONNECT_BACKOFF", 0)
+    monkeypatch.setattr(bot, "tg", sent.append)
+
+    bot.cancel_stale_orders()
+
+    assert bot.RESTORED_PENDING == {"BTCUSDT"}
+    assert len(sent) == 1 and "BTCUSDT" in sent[0]
@@ -0,0 +1,163 @@
+import os
+
+import pytest
+
+import bybit_bot as bot
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Only the strategies a test registers; fresh pipeline and caches"""
+    monkeypatch.setattr(bot, "STRATEGIES", [])
+    monkeypatch.setattr(bot, "STRATEGY_SIGNALS", {})
+    monkeypatch.setattr(bot, "PIPELINE", {})
+    monkeypatch.setattr(bot, "FEATURE_CACHE", {})
+    monkeypatch.setattr(bot, "book_features", lambda symbol: None)
+    return bot.STRATEGIES
+
+
+def features(**values):
+    base = {("5", "price", 0): 100.0, ("5", "atr", 14): 1.0, "book": None}
+    base.update(values)
+    return base
+
+
+def fixed(name, decision):
+    bot.register_strategy(name, {})(lambda symbol, snapshot: decision)
+
+
+# ===============================
+# REGISTRY
+# ===============================
+
+def test_shared_features_are_planned_once(registry):
+    bot.register_strategy("a", {"fast": ("5", "sma", 9), "rsi": ("5", "rsi", 14)})(lambda s, snap: None)
+    bot.register_strategy("b", {"sma": ("5", "sma", 9), "trend": ("15", "sma", 50)})(lambda s, snap: None)
+
+    assert bot.PIPELINE["5"]["features"] == {("price", 0), ("atr", 14), ("sma", 9), ("rsi", 14)}
+    assert bot.PIPELINE["15"]["features"] == {("sma", 50)}
+    assert bot.PIPELINE["15"]["bars"] == 51
+
+
+def test_reregistering_replaces(registry, journal):
+    fixed("a", "LONG")
+    fixed("a", "SHORT")
+
+    assert [s["name"] for s in registry] == ["a"]
+    assert bot.evaluate_strategies("BTCUSDT", features())[0] == "SHORT"
+
+
+def test_unknown_indicator_is_rejected(registry):
+    with pytest.raises(ValueError):
+        bot.register_strategy("bad", {"x": ("5", "macd", 12)})(lambda s, snap: None)
+
+
+def test_first_signal_wins(registry, journal):
+    fixed("quiet", None)
+    fixed("long", "LONG")
+    fixed("also_long", "LONG")
+
+    decision, snapshot = bot.evaluate_strategies("BTCUSDT", features())
+
+    assert decision == "LONG" and snapshot["price"] == 100.0
+    assert bot.STRATEGY_SIGNALS["BTCUSDT"] == {"quiet": None, "long": "LONG", "also_long": "LONG"}
+
+
+def test_disagreement_returns_none(registry, journal):
+    fixed("long", "LONG")
+    fixed("short", "SHORT")
+
+    assert bot.evaluate_strategies("BTCUSDT", features()) == (None, None)
+    assert bot.STRATEGY_SIGNALS["BTCUSDT"] == {"long": "LONG", "short": "SHORT"}
+
+
+def test_failing_strategy_counts_as_no_signal(registry, journal):
+    def broken(symbol, snapshot):
+        raise KeyError("rsi")
+
+    bot.register_strategy("broken", {})(broken)
+    fixed("long", "LONG")
+
+    assert bot.evaluate_strategies("BTCUSDT", features())[0] == "LONG"
+
+
+# ===============================
+# FEATURE CACHE (CLOSED BARS)
+# ===============================
+
+def klines(count, newest_start, close=100.0):
+    """Bybit order: newest (forming) bar first"""
+    return [
+        [str(newest_start - i), "1", "2", "0.5", str(close + i), "9"]
+        for i in range(count)
+    ]
+
+
+def test_features_cached_per_closed_bar(registry, monkeypatch):
+    calls = []
+    monkeypatch.setitem(bot.INDICATORS, "count", lambda bars, period: calls.append(bars["close"][-1]) or len(calls))
+    bot.register_strategy("c", {"n": ("5", "count", 1)})(lambda s, snap: None)
+
+    rows = klines(60, 1000)
+    monkeypatch.setattr(bot, "get_klines", lambda symbol, tf, limit: rows[:limit])
+
+    first = bot.compute_features("BTCUSDT")
+    rows[0][4] = "123"                     # forming bar ticks
+    second = bot.compute_features("BTCUSDT")
+
+    assert len(calls) == 1
+    assert calls[0] == 101.0               # last closed bar, not the forming one
+    assert first[("5", "price", 0)] == 100.0 and second[("5", "price", 0)] == 123.0
+
+    rows[:] = klines(60, 1001)             # a bar closed
+    bot.compute_features("BTCUSDT")
+    assert len(calls) == 2
+
+
+def test_no_closed_bar_is_no_data(registry, monkeypatch):
+    monkeypatch.setattr(bot, "get_klines", lambda symbol, tf, limit: klines(1, 1000))
+    assert bot.compute_features("BTCUSDT") is None
+
+
+# ===============================
+# JOURNAL STRATEGY COLUMN
+# ===============================
+
+def test_journal_strategy_column(journal):
+    bot.STRATEGY_CONTEXT.name = "sma_rsi"
+    try:
+        bot.journal_decision("BTCUSDT", {"price": 100.0}, "LONG", "SIGNAL")
+    finally:
+        bot.STRATEGY_CONTEXT.name = None
+    bot.journal_decision("BTCUSDT", None, None, "NO_DATA")
+    bot.journal_flush()
+
+    assert bot.journal_filter_stats()["SIGNAL"]["count"] == 1
+    assert bot.journal_filter_stats(strategy="sma_rsi")["NO_DATA"]["count"] == 0
+    assert bot.journal_filter_stats(strategy="sma_rsi")["SIGNAL"]["count"] == 1
+
+
+def test_strategies_without_reasons_get_outcome_rows(registry, journal):
+    fixed("long", "LONG")
+    fixed("quiet", None)
+
+    bot.evaluate_strategies("BTCUSDT", features())
+    bot.journal_flush()
+
+    assert bot.journal_filter_stats(strategy="long")["SIGNAL"]["count"] == 1
+    assert bot.journal_filter_stats(strategy="quiet")["NO_SETUP"]["count"] == 1
+
+
+def test_journal_reads_days_without_new_columns(journal):
+    bot.journal_close("BTCUSDT", "LONG", 110.0, 0.2, 100.5, 1.9)
+    bot.journal_flush()
+
+    day = bot.journal_days()[0]
+    os.remove(os.path.join(str(journal), day, "strategy.col"))
+
+    bot.journal_close("BTCUSDT", "LONG", 111.0, 0.2, 100.5, 2.1)
+    bot.journal_flush()
+
+    cols = bot.journal_open_day(day)
+    assert len(cols["ts"]) == 2
+    assert list(cols["strategy"]) == [0, 0]
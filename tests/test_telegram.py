@@ -0,0 +1,142 @@
+import time
+
+import pytest
+
+import bybit_bot as bot
+
+
+class Pool:
+    """TG_POOL stand-in: keeps jobs until run()"""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, fn, *args):
+        self.jobs.append((fn, args))
+
+    def run(self):
+        jobs, self.jobs = self.jobs, []
+        for fn, args in jobs:
+            fn(*args)
+
+
+class RecordingSession:
+    """Records exchange calls (get_balance swallows any error)"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        self.calls.append(name)
+        raise ConnectionError("Bybit unreachable")
+
+
+@pytest.fixture
+def telegram(monkeypatch):
+    sent = []
+    pool = Pool()
+    monkeypatch.setattr(bot, "tg", sent.append)
+    monkeypatch.setattr(bot, "TG_POOL", pool)
+    monkeypatch.setattr(bot, "BOT_ACTIVE", True)
+    monkeypatch.setattr(bot, "KILL_SWITCH", False)
+    monkeypatch.setattr(bot, "TRADES_TODAY", 3)
+    monkeypatch.setattr(bot, "DAILY_PNL", -5.0)
+    monkeypatch.setattr(bot, "START_DAY_BALANCE", 900.0)
+    monkeypatch.setattr(bot, "LAST_BALANCE", (1000.0, time.time()))
+    monkeypatch.setattr(bot, "SHARD_STATUS", {})
+    return sent, pool
+
+
+# ===============================
+# DISPATCH
+# ===============================
+
+@pytest.mark.parametrize("text", ["/stop", "/STOP", "/stop now", "/stop@my_bot please"])
+def test_control_commands_run_inline(telegram, text):
+    sent, pool = telegram
+
+    bot.dispatch_command(text)
+
+    assert not bot.BOT_ACTIVE
+    assert not pool.jobs
+
+
+def test_queries_go_to_the_pool(telegram):
+    sent, pool = telegram
+
+    bot.dispatch_command("/status")
+    assert not sent and len(pool.jobs) == 1
+
+    pool.run()
+    assert sent[0].startswith("📊 STATUS")
+
+
+def test_commands_apply_in_arrival_order(telegram):
+    for text in ("/kill", "/start", "/stop"):
+        bot.dispatch_command(text)
+
+    assert not bot.KILL_SWITCH and not bot.BOT_ACTIVE
+
+
+def test_reset_makes_no_exchange_call_inline(telegram, monkeypatch):
+    sent, pool = telegram
+    monkeypatch.setattr(bot, "KILL_SWITCH", True)
+    exchange = RecordingSession()
+    monkeypatch.setattr(bot, "session", exchange)
+
+    bot.dispatch_command("/reset")
+
+    assert exchange.calls == []
+    assert (bot.TRADES_TODAY, bot.DAILY_PNL, bot.KILL_SWITCH) == (0, 0.0, False)
+    assert bot.START_DAY_BALANCE == 1000.0          # cached balance
+    assert len(pool.jobs) == 1
+
+    class Wallet:
+        def get_wallet_balance(self, **kw):
+            return {"result": {"list": [{"totalWalletBalance": "1234.5"}]}}
+
+    monkeypatch.setattr(bot, "session", Wallet())
+    pool.run()
+    assert bot.START_DAY_BALANCE == 1234.5
+    assert sent[-1].startswith("🔄 DAILY RESET DONE")
+
+
+# ===============================
+# VIEWS
+# ===============================
+
+def test_trades_use_shard_marks(telegram, monkeypatch):
+    monkeypatch.setattr(bot, "OPEN_TRADES", {})
+    bot.SHARD_STATUS[0] = {
+        "time": time.time(),
+        "symbols": ["BTCUSDT"],
+        "open_trades": {"BTCUSDT": {"side": "SHORT", "entry": 100.0, "fill": 100.0, "qty": 2.0, "sl": 105.0}},
+        "marks": {"BTCUSDT": 99.0},
+        "scan_stats": {"passes": 0},
+        "exec_stats": {},
+        "book_ages": []
+    }
+
+    text = bot.trades_text()
+
+    assert "BTCUSDT SHORT 2.0 @ 100.0" in text
+    assert "PnL 2.0 (1.0%)" in text
+
+
+def test_history_pages(telegram, journal, monkeypatch):
+    monkeypatch.setattr(bot, "TG_PAGE_SIZE", 2)
+    for n in range(5):
+        bot.journal_close(f"S{n}USDT", "LONG", 101.0, 1.0, 100.0, 1.0)
+
+    first = bot.history_text(1)
+    assert first.startswith("📜 HISTORY 1/3")
+    assert first.endswith("/history 2 for more")
+    assert "S4USDT" in first and "S2USDT" not in first
+
+    last = bot.history_text(99)                     # clamped to the last page
+    assert last.startswith("📜 HISTORY 3/3")
+    assert "S0USDT" in last and "for more" not in last
+
+
+def test_history_without_trades(telegram, journal):
+    assert bot.history_text(1) == "📜 No closed trades in the journal"